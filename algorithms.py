@@ -1,109 +1,596 @@
 import time
-import networkx as nx
-from geopy.distance import geodesic
-import matplotlib.pyplot as plt
+import heapq
+from collections import OrderedDict, deque
+import numpy as np
 import random
+import weakref
+from compact_graph import CompactGraph, as_compact_graph, graph_version
+from distance_engine import haversine_km
+
+# networkx and matplotlib are imported inside the functions that need them,
+# so importing this module for route queries stays fast
+
+# Simulated energy consumption per unit of latency
+ENERGY_PER_LATENCY = 0.01
+
+# Chance of losing a packet on each hop
+PACKET_LOSS_PROBABILITY = 0.1
+
+# Slack on the A* lower bound, so rounding in the distance formulas can never make it overestimate
+HEURISTIC_SLACK = 1.0 - 1e-9
+
+# Raised by the array-backed Bellman-Ford engine when a negative cycle is reachable
+class NegativeCycleError(Exception):
+    pass
+
+# Result of one route query. Cost, per-hop weights, energy and delivery are all computed once,
+# while the path is reconstructed, so reporting never walks the graph again. It still behaves
+# like the node list the routing functions used to return (len, iteration, indexing, == list).
+class RouteResult:
+    __slots__ = ("path", "node_ids", "hop_weights", "cost", "energy", "delivery", "algorithm", "expanded")
+
+    def __init__(self, path, node_ids, hop_weights, algorithm=None, expanded=0):
+        self.path = path
+        self.node_ids = node_ids  # int64 array of node IDs along the path
+        self.hop_weights = hop_weights  # float array, one weight per hop
+        self.cost = float(hop_weights.sum())
+        self.energy = self.cost * ENERGY_PER_LATENCY
+        losses = sum(random.random() < PACKET_LOSS_PROBABILITY for _ in range(len(hop_weights)))
+        self.delivery = (1 - PACKET_LOSS_PROBABILITY) ** losses
+        self.algorithm = algorithm
+        self.expanded = expanded  # Nodes the search settled before it stopped
+
+    @property
+    def hops(self):
+        return len(self.hop_weights)
+
+    def __len__(self):
+        return len(self.path)
+
+    def __iter__(self):
+        return iter(self.path)
+
+    def __getitem__(self, i):
+        return self.path[i]
+
+    def __bool__(self):
+        return bool(self.path)
+
+    def __eq__(self, other):
+        if isinstance(other, RouteResult):
+            return self.path == other.path
+        if isinstance(other, (list, tuple)):
+            return self.path == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self):
+        return str(self.path)
+
+    def __repr__(self):
+        return f"RouteResult({self.path!r}, cost={self.cost!r}, algorithm={self.algorithm!r})"
+
+# Function to rebuild a route from predecessor arrays: pred[v] is the node before v and
+# pred_weight[v] the weight of that hop. Names are only looked up here, at the output boundary.
+def _route_result(cg, pred, pred_weight, source, target, algorithm, expanded):
+    ids = [target]
+    while ids[-1] != source:
+        ids.append(int(pred[ids[-1]]))
+    ids.reverse()
+    node_ids = np.array(ids, dtype=np.int64)
+    hop_weights = np.asarray(pred_weight, dtype=np.float64)[node_ids[1:]]
+    return RouteResult(cg.path_names(ids), node_ids, hop_weights, algorithm, expanded)
+
+# Function to run Dijkstra on a CompactGraph, relaxing each settled node's CSR slice at once
+def _dijkstra_ids(cg, source, target):
+    dist = np.full(cg.number_of_nodes(), np.inf)
+    pred = np.full(cg.number_of_nodes(), -1, dtype=np.int64)
+    pred_weight = np.zeros(cg.number_of_nodes())
+    settled = np.zeros(cg.number_of_nodes(), dtype=bool)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    expanded = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if settled[u]:
+            continue
+        settled[u] = True
+        expanded += 1
+        if u == target:
+            return _route_result(cg, pred, pred_weight, source, target, "Dijkstra", expanded)
+        nbrs, weights = cg.neighbors(u)
+        candidate = d + weights
+        better = candidate < dist[nbrs]
+        if better.any():
+            nbrs, candidate = nbrs[better], candidate[better]
+            dist[nbrs] = candidate
+            pred[nbrs] = u
+            pred_weight[nbrs] = weights[better]
+            for item in zip(candidate.tolist(), nbrs.tolist()):
+                heapq.heappush(heap, item)
+    return None
+
+# Function to run Dijkstra from one source to every node; returns (dist, pred, pred_weight) arrays
+def _shortest_path_tree(cg, source):
+    n = cg.number_of_nodes()
+    dist = np.full(n, np.inf)
+    pred = np.full(n, -1, dtype=np.int64)
+    pred_weight = np.zeros(n)
+    settled = np.zeros(n, dtype=bool)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if settled[u]:
+            continue
+        settled[u] = True
+        nbrs, weights = cg.neighbors(u)
+        candidate = d + weights
+        better = candidate < dist[nbrs]
+        if better.any():
+            nbrs, candidate = nbrs[better], candidate[better]
+            dist[nbrs] = candidate
+            pred[nbrs] = u
+            pred_weight[nbrs] = weights[better]
+            for item in zip(candidate.tolist(), nbrs.tolist()):
+                heapq.heappush(heap, item)
+    return dist, pred, pred_weight
+
+# Function to run Dijkstra from both ends at once; rg is the reverse graph (cg itself when undirected).
+# mu tracks the best source-to-target cost seen where the two searches touch, and the search
+# stops once the two queue minima together cannot beat it.
+def _bidirectional_dijkstra_ids(cg, rg, source, target):
+    n = cg.number_of_nodes()
+    dist = [np.full(n, np.inf), np.full(n, np.inf)]
+    pred = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+    pred_weight = [np.zeros(n), np.zeros(n)]
+    settled = [np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)]
+    heaps = [[(0.0, source)], [(0.0, target)]]
+    graphs = (cg, rg)
+    dist[0][source] = 0.0
+    dist[1][target] = 0.0
+    mu, meet = (0.0, source) if source == target else (np.inf, -1)
+    expanded = 0
+    while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < mu:
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1  # Grow the cheaper frontier
+        d, u = heapq.heappop(heaps[side])
+        if settled[side][u]:
+            continue
+        settled[side][u] = True
+        expanded += 1
+        nbrs, weights = graphs[side].neighbors(u)
+        candidate = d + weights
+        better = candidate < dist[side][nbrs]
+        if better.any():
+            nbrs, candidate, weights = nbrs[better], candidate[better], weights[better]
+            dist[side][nbrs] = candidate
+            pred[side][nbrs] = u
+            pred_weight[side][nbrs] = weights
+            for item in zip(candidate.tolist(), nbrs.tolist()):
+                heapq.heappush(heaps[side], item)
+            through = candidate + dist[1 - side][nbrs]
+            k = int(np.argmin(through))
+            if through[k] < mu:
+                mu, meet = float(through[k]), int(nbrs[k])
+    if meet < 0:
+        return None
+
+    # Forward half: source .. meet through the forward predecessors
+    ids = [meet]
+    while ids[-1] != source:
+        ids.append(int(pred[0][ids[-1]]))
+    ids.reverse()
+    hop_weights = [float(pred_weight[0][v]) for v in ids[1:]]
+    # Backward half: meet .. target, where pred[1][v] is the node after v on the way to the target
+    v = meet
+    while v != target:
+        hop_weights.append(float(pred_weight[1][v]))
+        v = int(pred[1][v])
+        ids.append(v)
+    return RouteResult(cg.path_names(ids), np.array(ids, dtype=np.int64), np.array(hop_weights),
+                       "Bidirectional Dijkstra", expanded)
+
+# Function to run Bellman-Ford on a CompactGraph's edge arrays. Each round relaxes, in one
+# np.minimum.at call, every edge leaving a node that improved in the previous round; it stops
+# once a round improves nothing. A round still improving after n rounds means a negative cycle.
+# expanded counts the distinct nodes whose out-edges were relaxed.
+def _bellman_ford_ids(cg, source, target):
+    n = cg.number_of_nodes()
+    sources, targets, weights = cg.edge_arrays()
+    weights = np.asarray(weights, dtype=np.float64)
+    dist = np.full(n, np.inf)
+    pred = np.full(n, -1, dtype=np.int64)
+    pred_weight = np.zeros(n)
+    changed = np.zeros(n, dtype=bool)
+    dist[source] = 0.0
+    changed[source] = True
+    processed = np.zeros(n, dtype=bool)  # Nodes whose out-edges were relaxed at least once
+    rounds = 0
+    while changed.any():
+        if rounds == n:
+            raise NegativeCycleError  # Still relaxing after n rounds
+        rounds += 1
+        processed |= changed
+        active = np.flatnonzero(changed[sources])
+        u, v, w = sources[active], targets[active], weights[active]
+        candidate = dist[u] + w
+        before = dist[v]
+        np.minimum.at(dist, v, candidate)
+        # Edges that set a node's new distance become its predecessor links
+        improved = (candidate < before) & (candidate == dist[v])
+        pred[v[improved]] = u[improved]
+        pred_weight[v[improved]] = w[improved]
+        changed[:] = False
+        changed[v[improved]] = True
+    if not np.isfinite(dist[target]):
+        return None
+    return _route_result(cg, pred, pred_weight, source, target, "Bellman-Ford", int(np.count_nonzero(processed)))
+
+# Function to run SPFA (queue-based label correcting) with the SLF and LLL queue heuristics.
+# Only nodes whose distance changed are queued, once at a time. SLF puts a node at the front when
+# it beats the current front; LLL sends the front to the back while it is above the queue's mean.
+# A node relaxed n times triggers a walk up its predecessors: if that walk never ends, the
+# predecessor links contain a cycle, which must be negative.
+def _spfa_ids(cg, source, target):
+    n = cg.number_of_nodes()
+    dist = [float('inf')] * n
+    pred = [-1] * n
+    pred_weight = [0.0] * n
+    relaxations = [0] * n
+    queued = bytearray(n)
+    dist[source] = 0.0
+    queue = deque([source])
+    queued[source] = 1
+    total = 0.0  # Sum of the distances of queued nodes
+    expanded = 0
+    while queue:
+        average = total / len(queue)
+        for _ in range(len(queue) - 1):
+            if dist[queue[0]] <= average:
+                break
+            queue.rotate(-1)
+        u = queue.popleft()
+        queued[u] = 0
+        du = dist[u]
+        total -= du
+        expanded += 1
+        nbrs, weights = cg.neighbors(u)
+        for v, w in zip(nbrs.tolist(), weights.tolist()):
+            if du + w >= dist[v]:
+                continue
+            if queued[v]:
+                total += du + w - dist[v]
+            dist[v] = du + w
+            pred[v] = u
+            pred_weight[v] = w
+            relaxations[v] += 1
+            if relaxations[v] >= n:
+                x = v
+                for _ in range(n):
+                    x = pred[x]
+                    if x < 0:
+                        break
+                else:
+                    raise NegativeCycleError
+                relaxations[v] = 0  # The links still lead back to the source
+            if not queued[v]:
+                queued[v] = 1
+                total += dist[v]
+                if queue and dist[v] < dist[queue[0]]:
+                    queue.appendleft(v)
+                else:
+                    queue.append(v)
+    if dist[target] == float('inf'):
+        return None
+    return _route_result(cg, pred, pred_weight, source, target, "SPFA", expanded)
+
+# Function to run A* on a CompactGraph; heuristic maps an array of node IDs to estimates
+def _a_star_ids(cg, source, target, heuristic, algorithm="A*"):
+    dist = np.full(cg.number_of_nodes(), np.inf)
+    pred = np.full(cg.number_of_nodes(), -1, dtype=np.int64)
+    pred_weight = np.zeros(cg.number_of_nodes())
+    closed = np.zeros(cg.number_of_nodes(), dtype=bool)
+    dist[source] = 0.0
+    heap = [(float(heuristic(np.array([source]))[0]), source)]
+    expanded = 0
+    while heap:
+        _, u = heapq.heappop(heap)
+        if closed[u]:
+            continue
+        closed[u] = True
+        expanded += 1
+        if u == target:
+            return _route_result(cg, pred, pred_weight, source, target, algorithm, expanded)
+        nbrs, weights = cg.neighbors(u)
+        candidate = dist[u] + weights
+        better = (candidate < dist[nbrs]) & ~closed[nbrs]
+        if better.any():
+            nbrs, candidate = nbrs[better], candidate[better]
+            dist[nbrs] = candidate
+            pred[nbrs] = u
+            pred_weight[nbrs] = weights[better]
+            for item in zip((candidate + heuristic(nbrs)).tolist(), nbrs.tolist()):
+                heapq.heappush(heap, item)
+    return None
+
+# Function to get the weight of every hop along a path
+def _path_weights(G, path):
+    if isinstance(path, RouteResult):
+        return path.hop_weights.tolist()
+    if hasattr(G, "node_id"):
+        ids = [G.node_id(node) for node in path]
+        return [G.edge_weight(u, v) for u, v in zip(ids[:-1], ids[1:])]
+    return [G.edges[u, v]['weight'] for u, v in zip(path[:-1], path[1:])]
 
 # Dijkstra Algorithm to find the shortest path
 def dijkstra_algorithm(G, source, target):
-    try:
-        path = nx.dijkstra_path(G, source=source, target=target, weight='weight')
-        return path
-    except nx.NetworkXNoPath:
+    cg = as_compact_graph(G)
+    route = _dijkstra_ids(cg, cg.node_id(source), cg.node_id(target))
+    if route is None:
         print(f"No path exists between {source} and {target} using Dijkstra.")
-        return None
+    return route
+
+# Bidirectional Dijkstra: searches from source and target until the two frontiers meet
+def bidirectional_dijkstra_algorithm(G, source, target):
+    cg = as_compact_graph(G)
+    rg = cg.reverse() if cg.directed else cg
+    route = _bidirectional_dijkstra_ids(cg, rg, cg.node_id(source), cg.node_id(target))
+    if route is None:
+        print(f"No path exists between {source} and {target} using Bidirectional Dijkstra.")
+    return route
 
 # Bellman-Ford Algorithm to handle graphs with negative edge weights
 def bellman_ford_algorithm(G, source, target):
+    cg = as_compact_graph(G)
+    if not hasattr(cg, "edge_arrays"):
+        print("Bellman-Ford needs a graph with explicit edges.")
+        return None
     try:
-        path = nx.bellman_ford_path(G, source=source, target=target, weight='weight')
-        return path
-    except nx.NetworkXUnbounded:
+        route = _bellman_ford_ids(cg, cg.node_id(source), cg.node_id(target))
+    except NegativeCycleError:
         print("Negative weight cycle detected. Bellman-Ford cannot compute shortest paths.")
         return None
-    except nx.NetworkXNoPath:
+    if route is None:
         print(f"No path exists between {source} and {target} using Bellman-Ford.")
-        return None
+    return route
 
-# A* Algorithm with heuristic based on geodesic distance
-def a_star_algorithm(G, source, target):
-    def heuristic(node1, node2):
-        pos1 = G.nodes[node1]['pos']
-        pos2 = G.nodes[node2]['pos']
-        # Ensure the heuristic is admissible (never overestimates the cost)
-        return geodesic((pos1[1], pos1[0]), (pos2[1], pos2[0])).kilometers  # lat, lon
+# Per-graph (version, latency per unit of straight-line distance) found by _latency_scale
+_latency_scales = weakref.WeakKeyDictionary()
+
+# Function to get the straight-line distance between nodes a and b (IDs, arrays or slices):
+# great-circle km for geographic graphs, whose pos is (longitude, latitude), else Euclidean
+def _straight_line(cg, a, b):
+    pa, pb = cg.pos[a], cg.pos[b]
+    if getattr(cg, "metric", "euclidean") == "haversine":
+        return haversine_km(pa[..., 1], pa[..., 0], pb[..., 1], pb[..., 0])
+    return np.sqrt(((pa - pb) ** 2).sum(axis=-1))
 
+# Function to find the largest factor c with c * straight-line length <= weight on every live edge.
+# By the triangle inequality, c * straight-line distance to the target then never overestimates
+# the remaining latency. Graphs that know the bound from their latency model report it directly.
+def _latency_scale(cg):
+    if hasattr(cg, "latency_scale"):
+        return cg.latency_scale() * HEURISTIC_SLACK
+    version = graph_version(cg)
+    cached = _latency_scales.get(cg)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    sources, targets, weights = cg.edge_arrays()
+    lengths = _straight_line(cg, sources, targets)
+    positive = lengths > 0
+    if not positive.any() or weights.min() < 0:
+        scale = 0.0
+    else:
+        scale = max(float((weights[positive] / lengths[positive]).min()), 0.0) * HEURISTIC_SLACK
+    _latency_scales[cg] = (version, scale)
+    return scale
+
+# Function to build the A* heuristic for one target: the latency lower bound of every node,
+# computed once as an array and then looked up by ID
+def _latency_heuristic(cg, goal):
+    if cg.pos is None:
+        estimates = np.zeros(cg.number_of_nodes())
+    else:
+        estimates = _latency_scale(cg) * _straight_line(cg, slice(None), goal)
+    return lambda ids: estimates[ids]
+
+# SPFA Algorithm: queue-driven alternative to Bellman-Ford for graphs with negative edge weights
+def spfa_algorithm(G, source, target):
+    cg = as_compact_graph(G)
     try:
-        path = nx.astar_path(G, source=source, target=target, weight='weight', heuristic=heuristic)
-        return path
-    except nx.NetworkXNoPath:
-        print(f"No path exists between {source} and {target} using A*.")
+        route = _spfa_ids(cg, cg.node_id(source), cg.node_id(target))
+    except NegativeCycleError:
+        print("Negative weight cycle detected. SPFA cannot compute shortest paths.")
         return None
+    if route is None:
+        print(f"No path exists between {source} and {target} using SPFA.")
+    return route
+
+# A* Algorithm with an admissible heuristic: straight-line distance to the target, in latency units
+def a_star_algorithm(G, source, target):
+    cg = as_compact_graph(G)
+    goal = cg.node_id(target)
+    try:
+        route = _a_star_ids(cg, cg.node_id(source), goal, _latency_heuristic(cg, goal))
     except Exception as e:
         print(f"Error in A* Algorithm: {e}")
         return None
+    if route is None:
+        print(f"No path exists between {source} and {target} using A*.")
+    return route
+
+# Routing functions selectable by name (RouteCache, comparisons)
+ROUTING_ALGORITHMS = {
+    "dijkstra": dijkstra_algorithm,
+    "bidirectional-dijkstra": bidirectional_dijkstra_algorithm,
+    "bellman-ford": bellman_ford_algorithm,
+    "spfa": spfa_algorithm,
+    "a*": a_star_algorithm,
+}
+
+# Function to look up a routing function by name. ALT and contraction hierarchies live in modules
+# that import this one, so they are added to ROUTING_ALGORITHMS on first use.
+def get_routing_algorithm(name):
+    if "alt" not in ROUTING_ALGORITHMS:
+        from contraction import contraction_hierarchy_algorithm
+        from landmarks import alt_algorithm
+
+        ROUTING_ALGORITHMS["alt"] = alt_algorithm
+        ROUTING_ALGORITHMS["ch"] = contraction_hierarchy_algorithm
+    return ROUTING_ALGORITHMS[name]
+
+# Bounded LRU cache of route results for one graph, keyed by (graph version, algorithm, source, target).
+# A change of the graph's version (see network_model.update_edge_latencies) drops every entry.
+# nx graphs without G.graph["version"] cannot report in-place edits, so their routes are never
+# stored: every call is a miss that routes on the live graph.
+class RouteCache:
+    def __init__(self, G, maxsize=1024):
+        self.graph = G
+        self.cacheable = hasattr(G, "version") or "version" in G.graph
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = graph_version(G)
+        self._entries = OrderedDict()
+
+    # Function to get a route from the cache, running the routing function on a miss
+    # algorithm is a name known to get_routing_algorithm or a routing function
+    def route(self, source, target, algorithm="dijkstra"):
+        version = graph_version(self.graph)
+        if version != self._version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._version = version
+
+        name = algorithm if isinstance(algorithm, str) else algorithm.__name__
+        key = (version, name, source, target)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        routing_function = get_routing_algorithm(algorithm) if isinstance(algorithm, str) else algorithm
+        result = routing_function(self.graph, source, target)
+        if not self.cacheable:
+            return result
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    # Function to drop every cached route
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Function to report the cache counters
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations, "size": len(self._entries), "maxsize": self.maxsize}
 
 # Function to calculate energy consumption
 def calculate_energy_consumption(path, G):
+    if isinstance(path, RouteResult):
+        return path.energy
     energy = 0
-    for i in range(len(path) - 1):
+    for latency in _path_weights(G, path):
         # Energy consumption is proportional to latency and distance
-        latency = G.edges[path[i], path[i + 1]]['weight']
-        energy += latency * 0.01  # Simulated energy consumption factor
+        energy += latency * ENERGY_PER_LATENCY  # Simulated energy consumption factor
     return energy
 
 # Function to simulate packet delivery
 def simulate_packet_delivery(path, G):
-    packet_loss_probability = 0.1  # 10% chance of packet loss per hop
+    if isinstance(path, RouteResult):
+        return path.delivery
     successful_delivery = 1.0
-    for i in range(len(path) - 1):
-        latency = G.edges[path[i], path[i + 1]]['weight']
-        if random.random() < packet_loss_probability:
-            successful_delivery *= (1 - packet_loss_probability)
+    for latency in _path_weights(G, path):
+        if random.random() < PACKET_LOSS_PROBABILITY:
+            successful_delivery *= (1 - PACKET_LOSS_PROBABILITY)
     return successful_delivery
 
+# Function to print one route and its metrics
+def _report_route(label, route, source, target):
+    if route:
+        print(f"{label} from {source} to {target}: {route}")
+        print(f"Total Latency: {route.cost}")
+        print(f"Energy Consumption: {route.energy}")
+        print(f"Packet Delivery Success Rate: {route.delivery}")
+        print(f"Nodes Expanded: {route.expanded}")
+
 # Function to compare all routing algorithms and print results
 def compare_routing_algorithms(G, source, target):
+    from contraction import contraction_hierarchy_algorithm
+    from landmarks import alt_algorithm
+
     # Compare Dijkstra
     print("\nDijkstra Algorithm:")
-    dijkstra_path = dijkstra_algorithm(G, source, target)
-    if dijkstra_path:
-        print(f"Shortest Path from {source} to {target}: {dijkstra_path}")
-        print(f"Total Latency: {sum(G.edges[u, v]['weight'] for u, v in zip(dijkstra_path[:-1], dijkstra_path[1:]))}")
-        print(f"Energy Consumption: {calculate_energy_consumption(dijkstra_path, G)}")
-        print(f"Packet Delivery Success Rate: {simulate_packet_delivery(dijkstra_path, G)}")
+    _report_route("Shortest Path", dijkstra_algorithm(G, source, target), source, target)
+
+    # Compare Bidirectional Dijkstra
+    print("\nBidirectional Dijkstra Algorithm:")
+    _report_route("Shortest Path", bidirectional_dijkstra_algorithm(G, source, target), source, target)
 
     # Compare Bellman-Ford
     print("\nBellman-Ford Algorithm:")
-    bellman_ford_path = bellman_ford_algorithm(G, source, target)
-    if bellman_ford_path:
-        print(f"Shortest Path from {source} to {target}: {bellman_ford_path}")
-        print(f"Total Latency: {sum(G.edges[u, v]['weight'] for u, v in zip(bellman_ford_path[:-1], bellman_ford_path[1:]))}")
-        print(f"Energy Consumption: {calculate_energy_consumption(bellman_ford_path, G)}")
-        print(f"Packet Delivery Success Rate: {simulate_packet_delivery(bellman_ford_path, G)}")
+    _report_route("Shortest Path", bellman_ford_algorithm(G, source, target), source, target)
+
+    # Compare SPFA
+    print("\nSPFA Algorithm:")
+    _report_route("Shortest Path", spfa_algorithm(G, source, target), source, target)
 
     # Compare A* Algorithm
     print("\nA* Algorithm:")
-    a_star_path = a_star_algorithm(G, source, target)
-    if a_star_path:
-        print(f"A* Path from {source} to {target}: {a_star_path}")
-        print(f"Total Latency: {sum(G.edges[u, v]['weight'] for u, v in zip(a_star_path[:-1], a_star_path[1:]))}")
-        print(f"Energy Consumption: {calculate_energy_consumption(a_star_path, G)}")
-        print(f"Packet Delivery Success Rate: {simulate_packet_delivery(a_star_path, G)}")
+    _report_route("A* Path", a_star_algorithm(G, source, target), source, target)
+
+    # Compare ALT (A* with landmark bounds)
+    print("\nALT Algorithm:")
+    _report_route("ALT Path", alt_algorithm(G, source, target), source, target)
+
+    # Compare Contraction Hierarchy
+    print("\nContraction Hierarchy Algorithm:")
+    _report_route("Shortest Path", contraction_hierarchy_algorithm(G, source, target), source, target)
+
+# Function to get a read-only view of an nx graph without the links a FailureModel marked down
+def _live_links(G):
+    import networkx as nx
+
+    return nx.subgraph_view(G, filter_edge=lambda u, v: G.edges[u, v].get('up', True))
 
 # Efficiency analysis for large graphs
 def analyze_efficiency_for_large_graph(G, source, target):
+    import networkx as nx
+
     # Measure execution time of Dijkstra
     start_time = time.time()
     dijkstra_path = dijkstra_algorithm(G, source, target)
     dijkstra_time = time.time() - start_time
     print(f"\nDijkstra Algorithm execution time: {dijkstra_time:.6f} seconds")
+
+    # Measure execution time of Bidirectional Dijkstra
+    start_time = time.time()
+    bidirectional_path = bidirectional_dijkstra_algorithm(G, source, target)
+    bidirectional_time = time.time() - start_time
+    print(f"Bidirectional Dijkstra Algorithm execution time: {bidirectional_time:.6f} seconds")
     
     # Measure execution time of Bellman-Ford
     start_time = time.time()
     bellman_ford_path = bellman_ford_algorithm(G, source, target)
     bellman_ford_time = time.time() - start_time
     print(f"Bellman-Ford Algorithm execution time: {bellman_ford_time:.6f} seconds")
+
+    # Measure execution time of SPFA
+    start_time = time.time()
+    spfa_path = spfa_algorithm(G, source, target)
+    spfa_time = time.time() - start_time
+    print(f"SPFA Algorithm execution time: {spfa_time:.6f} seconds")
     
     # Measure execution time of A*
     start_time = time.time()
@@ -114,18 +601,26 @@ def analyze_efficiency_for_large_graph(G, source, target):
     # Check correctness: Compare paths with the built-in shortest path
     print("\nPath Correctness Analysis:")
     try:
-        nx_shortest_path = nx.shortest_path(G, source=source, target=target, weight='weight')
+        reference = _live_links(G.to_networkx() if isinstance(G, CompactGraph) else G)
+        nx_shortest_path = nx.shortest_path(reference, source=source, target=target, weight='weight')
         print(f"NetworkX shortest path: {nx_shortest_path}")
         print(f"Dijkstra path matches NetworkX: {dijkstra_path == nx_shortest_path}")
+        print(f"Bidirectional Dijkstra path matches NetworkX: {bidirectional_path == nx_shortest_path}")
         print(f"Bellman-Ford path matches NetworkX: {bellman_ford_path == nx_shortest_path}")
+        print(f"SPFA path matches NetworkX: {spfa_path == nx_shortest_path}")
         print(f"A* path matches NetworkX: {a_star_path == nx_shortest_path}")
     except Exception as e:
         print(f"Error in shortest path computation: {e}")
 
 # Function to visualize the network and the shortest path
 def visualize_network(G, source, target):
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
+    if isinstance(G, CompactGraph):
+        G = G.to_networkx()
     pos = nx.get_node_attributes(G, 'pos')
-    nx.draw(G, pos, with_labels=True, node_size=300, node_color='lightblue', font_size=8)
+    nx.draw(_live_links(G), pos, with_labels=True, node_size=300, node_color='lightblue', font_size=8)
     
     # Highlight the shortest path using Dijkstra
     dijkstra_path = dijkstra_algorithm(G, source, target)
@@ -138,6 +633,8 @@ def visualize_network(G, source, target):
 
 # Function to test scalability of algorithms
 def test_scalability():
+    import networkx as nx
+
     sizes = [10, 50, 100, 200]  # Number of nodes
     for size in sizes:
         G = nx.random_geometric_graph(size, radius=0.2)
@@ -148,4 +645,37 @@ def test_scalability():
         target = random.choice(list(G.nodes()))
         
         print(f"\nTesting scalability for {size} nodes:")
-        analyze_efficiency_for_large_graph(G, source, target)
\ No newline at end of file
+        analyze_efficiency_for_large_graph(G, source, target)
+
+# Function to test scalability on synthetic anycast topologies built around the real server sites
+def test_geographic_scalability(sizes=(1000, 10000), spread_km=600.0, base_threshold=600.0, seed=None):
+    from catalog import synthesize_anycast_catalog
+    from landmarks import precompute_landmarks
+    from network_model import build_network, DistanceCache, LatencyModel
+
+    source = "Beijing (F-Root)"
+    target = "Colombo (I-Root)"
+    for size in sizes:
+        catalog = synthesize_anycast_catalog(size, spread_km=spread_km, seed=seed)
+        threshold = base_threshold * (1000 / size) ** 0.5  # Keeps the average degree steady as density grows
+
+        start_time = time.time()
+        cache = DistanceCache(catalog, cache_dir=None)
+        G = build_network(threshold, LatencyModel(seed), catalog, cache, compact=True)
+        build_time = time.time() - start_time
+
+        print(f"\nTesting geographic scalability for {size} nodes "
+              f"({G.number_of_edges()} links within {threshold:.0f} km):")
+        print(f"Topology build time: {build_time:.6f} seconds")
+        analyze_efficiency_for_large_graph(G, source, target)
+
+        # Compare the search space of plain Dijkstra and A* with the landmark (ALT) mode
+        start_time = time.time()
+        index = precompute_landmarks(G, seed=seed)
+        print(f"ALT preprocessing time ({len(index.landmarks)} landmarks): {time.time() - start_time:.6f} seconds")
+        start_time = time.time()
+        alt_path = index.route(source, target)
+        print(f"ALT Algorithm execution time: {time.time() - start_time:.6f} seconds")
+        routes = {"Dijkstra": dijkstra_algorithm(G, source, target), "A*": a_star_algorithm(G, source, target),
+                  "ALT": alt_path}
+        print("Nodes expanded: " + ", ".join(f"{name} {route.expanded}" for name, route in routes.items() if route))
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import numpy as np
+from algorithms import RouteResult, _shortest_path_tree
+from compact_graph import StaleIndexError, as_compact_graph, graph_version
+
+# Graph shared with worker processes (set once per worker by the pool initializer)
+_worker_graph = None
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+# Function computing one row of the tables: distances and predecessors from one source
+def _solve_row(source):
+    dist, pred, _ = _shortest_path_tree(_worker_graph, source)
+    return source, dist, pred
+
+# Precomputed all-pairs shortest paths: dist[s, t] is the latency from s to t and pred[s, t] the
+# node before t on that path (-1 if unreachable). Lookups are O(1) and paths are rebuilt in O(hops).
+class AllPairsTable:
+    def __init__(self, graph, dist, pred):
+        self.graph = graph
+        self.dist = dist
+        self.pred = pred
+        self.version = graph_version(graph)
+
+    # Function to check whether the graph changed since the table was built
+    def is_current(self):
+        return graph_version(self.graph) == self.version
+
+    # Function to refuse lookups once the weights changed (rebuild with precompute_all_pairs)
+    def _check_current(self):
+        if not self.is_current():
+            raise StaleIndexError("Graph changed since the all-pairs table was computed; run precompute_all_pairs again")
+
+    # Function to get the shortest-path latency between two nodes (inf if unreachable)
+    def latency(self, source, target):
+        self._check_current()
+        return float(self.dist[self.graph.node_id(source), self.graph.node_id(target)])
+
+    # Function to rebuild the shortest path between two nodes as a RouteResult (None if unreachable)
+    def route(self, source, target):
+        self._check_current()
+        s, t = self.graph.node_id(source), self.graph.node_id(target)
+        if not np.isfinite(self.dist[s, t]):
+            return None
+        row = self.pred[s]
+        ids = [t]
+        while ids[-1] != s:
+            ids.append(int(row[ids[-1]]))
+        ids.reverse()
+        node_ids = np.array(ids, dtype=np.int64)
+        hop_weights = np.diff(self.dist[s, node_ids])
+        if hasattr(self.graph, "slots"):
+            hop_weights = self.graph.weights[self.graph.slots(node_ids[:-1], node_ids[1:])].astype(np.float64)
+        return RouteResult(self.graph.path_names(ids), node_ids, hop_weights, "All-pairs")
+
+# Function to precompute the all-pairs distance and predecessor matrices by running Dijkstra from
+# every node, one row per task, spread over worker processes (processes=1 runs in-process)
+def precompute_all_pairs(G, processes=None):
+    graph = as_compact_graph(G)
+    n = graph.number_of_nodes()
+    dist = np.empty((n, n), dtype=np.float64)
+    pred = np.empty((n, n), dtype=np.int32 if n < 2 ** 31 else np.int64)
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or n < 2:
+        _init_worker(graph)
+        rows = map(_solve_row, range(n))
+        for source, dist_row, pred_row in rows:
+            dist[source], pred[source] = dist_row, pred_row
+    else:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(graph,)) as pool:
+            chunksize = max(1, n // (processes * 8))
+            for source, dist_row, pred_row in pool.imap_unordered(_solve_row, range(n), chunksize):
+                dist[source], pred[source] = dist_row, pred_row
+    return AllPairsTable(graph, dist, pred)
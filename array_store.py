@@ -0,0 +1,64 @@
+import json
+import os
+import numpy as np
+
+# File layout: MAGIC, a little-endian uint64 header length, a JSON header, then the raw arrays.
+# Each array starts on an ALIGNMENT-byte boundary so it can be viewed straight out of a memory map.
+MAGIC = b"GTARRAY1"
+ALIGNMENT = 64
+
+# Function to round an offset up to the next aligned position
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+# Function to write named arrays plus JSON-serializable metadata into one binary file
+def write_array_bundle(path, arrays, meta=None):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise TypeError(f"Array {name} has object dtype and cannot be stored")
+
+    # Lay the arrays out after the header; the header size depends on the offsets, so iterate
+    layout = {}
+    header = b""
+    while True:
+        offset = _align(len(MAGIC) + 8 + len(header))
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps({"meta": meta or {}, "arrays": layout}).encode("utf-8")
+        stable = len(encoded) == len(header)
+        header = encoded
+        if stable:
+            break
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).astype("<u8").tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(max(offset, f.tell()))
+    os.replace(tmp_path, path)  # Readers never see a half-written file
+
+# Function to open a bundle written by write_array_bundle.
+# Arrays are zero-copy views into one shared memory map; mode "c" (copy-on-write) lets callers
+# modify them privately, "r" keeps them strictly read-only.
+# Returns (arrays, meta).
+def read_array_bundle(path, mode="c"):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an array bundle")
+        header_len = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    buffer = np.memmap(path, dtype=np.uint8, mode=mode) if os.path.getsize(path) else np.zeros(0, np.uint8)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = spec["offset"]
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+    return arrays, header["meta"]
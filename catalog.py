@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+from itertools import islice
+import numpy as np
+from compact_graph import NodeInterner
+
+# Rows read per chunk by the streaming loaders
+CATALOG_CHUNK = 65536
+
+# Server catalog held as arrays: names interned to dense IDs plus an (n, 2) array of
+# (latitude, longitude). The graph builders accept it anywhere they accept the servers dict.
+class ServerCatalog:
+    def __init__(self, nodes, coords):
+        self.nodes = nodes if isinstance(nodes, NodeInterner) else NodeInterner(nodes)
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if len(self.nodes) != len(self.coords):
+            raise ValueError("Catalog needs exactly one coordinate pair per server name")
+
+    # Function to build a catalog from a {name: (lat, lon)} mapping such as network_model.servers
+    @classmethod
+    def from_mapping(cls, servers):
+        names = list(servers)
+        return cls(names, [servers[name] for name in names])
+
+    @property
+    def names(self):
+        return self.nodes.names
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def __getitem__(self, name):
+        lat, lon = self.coords[self.nodes.id_of(name)]
+        return float(lat), float(lon)
+
+# Function to find the column positions of the name / latitude / longitude fields in a header
+def _column_positions(header, columns):
+    try:
+        return [header.index(column) for column in columns]
+    except ValueError:
+        raise ValueError(f"Catalog header {header} is missing one of the columns {list(columns)}")
+
+# Function to stream (names, lat, lon) chunks from a CSV file with a header row
+def _iter_csv(path, columns, chunk_size):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        name_at, lat_at, lon_at = _column_positions(next(reader), columns)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            yield ([row[name_at] for row in rows],
+                   np.array([row[lat_at] for row in rows], dtype=np.float64),
+                   np.array([row[lon_at] for row in rows], dtype=np.float64))
+
+# Function to stream (names, lat, lon) chunks from a JSON Lines file (one object per line)
+def _iter_jsonl(path, columns, chunk_size):
+    name_key, lat_key, lon_key = columns
+    with open(path, encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        while True:
+            records = [json.loads(line) for line in islice(lines, chunk_size)]
+            if not records:
+                return
+            yield ([record[name_key] for record in records],
+                   np.fromiter((record[lat_key] for record in records), dtype=np.float64, count=len(records)),
+                   np.fromiter((record[lon_key] for record in records), dtype=np.float64, count=len(records)))
+
+# Function to stream (names, lat, lon) chunks from a Parquet file (needs pyarrow)
+def _iter_parquet(path, columns, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet catalogs requires pyarrow (pip install pyarrow)")
+
+    name_key, lat_key, lon_key = columns
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=list(columns)):
+        yield (batch.column(batch.schema.get_field_index(name_key)).to_pylist(),
+               batch.column(batch.schema.get_field_index(lat_key)).to_numpy(zero_copy_only=False).astype(np.float64),
+               batch.column(batch.schema.get_field_index(lon_key)).to_numpy(zero_copy_only=False).astype(np.float64))
+
+_READERS = {
+    ".csv": _iter_csv,
+    ".jsonl": _iter_jsonl,
+    ".ndjson": _iter_jsonl,
+    ".parquet": _iter_parquet,
+}
+
+# Function to stream a server catalog from CSV, JSON Lines or Parquet in chunks.
+# Coordinates go straight into growing numpy arrays and names into the ID mapping, so memory
+# stays at the final arrays plus one chunk. The result can be passed to build_network(servers=...).
+def load_server_catalog(path, name_column="name", lat_column="lat", lon_column="lon",
+                        chunk_size=CATALOG_CHUNK, file_format=None):
+    file_format = file_format or os.path.splitext(path)[1].lower()
+    if not file_format.startswith("."):
+        file_format = "." + file_format
+    reader = _READERS.get(file_format)
+    if reader is None:
+        raise ValueError(f"Unsupported catalog format: {file_format}")
+
+    nodes = NodeInterner()
+    coords = np.empty((chunk_size, 2), dtype=np.float64)
+    for names, lat, lon in reader(path, (name_column, lat_column, lon_column), chunk_size):
+        start = len(nodes)
+        for name in names:
+            nodes.intern(name)
+        stop = len(nodes)
+        if stop - start != len(names):
+            raise ValueError(f"Duplicate server names in catalog {path}")
+        if stop > len(coords):
+            coords = np.resize(coords, (max(stop, 2 * len(coords)), 2))
+        coords[start:stop, 0] = lat
+        coords[start:stop, 1] = lon
+    return ServerCatalog(nodes, coords[:len(nodes)].copy())
+
+# Function to synthesize a large anycast catalog by scattering replicas around real server sites.
+# The real sites are kept under their own names; each replica is placed at a random bearing and a
+# half-normal distance (scale spread_km) from a randomly chosen site, in vectorized chunks.
+def synthesize_anycast_catalog(n_nodes, servers=None, spread_km=600.0, seed=None, chunk_size=CATALOG_CHUNK):
+    from distance_engine import EARTH_RADIUS_KM, server_arrays
+
+    if servers is None:
+        from network_model import servers
+    site_names, site_coords = server_arrays(servers)
+    n_nodes = max(int(n_nodes), len(site_names))
+    rng = np.random.default_rng(seed)
+
+    nodes = NodeInterner(site_names)
+    coords = np.empty((n_nodes, 2), dtype=np.float64)
+    coords[:len(site_names)] = site_coords
+    site_lat, site_lon = np.radians(site_coords[:, 0]), np.radians(site_coords[:, 1])
+
+    for start in range(len(site_names), n_nodes, chunk_size):
+        stop = min(start + chunk_size, n_nodes)
+        m = stop - start
+        site = rng.integers(0, len(site_names), m)
+        bearing = rng.uniform(0.0, 2.0 * np.pi, m)
+        angle = np.abs(rng.normal(0.0, spread_km, m)) / EARTH_RADIUS_KM
+
+        # Destination point given a start point, bearing and angular distance on the sphere
+        lat1, lon1 = site_lat[site], site_lon[site]
+        lat2 = np.arcsin(np.sin(lat1) * np.cos(angle) + np.cos(lat1) * np.sin(angle) * np.cos(bearing))
+        lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(lat1),
+                                 np.cos(angle) - np.sin(lat1) * np.sin(lat2))
+        coords[start:stop, 0] = np.degrees(lat2)
+        coords[start:stop, 1] = (np.degrees(lon2) + 180.0) % 360.0 - 180.0
+
+        for k, s in zip(range(start, stop), site.tolist()):
+            nodes.intern(f"{site_names[s]} #{k}")
+    return ServerCatalog(nodes, coords)
@@ -0,0 +1,496 @@
+import json
+import weakref
+import numpy as np
+from array_store import read_array_bundle, write_array_bundle
+
+# Maps node names to dense integer IDs (0..n-1) and back.
+# Routing runs on the IDs; names are only looked up at the input/output boundary.
+class NodeInterner:
+    def __init__(self, names=()):
+        self.names = []
+        self.index = {}
+        for name in names:
+            self.intern(name)
+
+    # Function to get the ID of a name, assigning the next free ID to unseen names
+    def intern(self, name):
+        node_id = self.index.get(name)
+        if node_id is None:
+            node_id = self.index[name] = len(self.names)
+            self.names.append(name)
+        return node_id
+
+    # Function to get the ID of a known name (KeyError for unknown names)
+    def id_of(self, name):
+        return self.index[name]
+
+    # Function to translate a sequence of IDs back to names
+    def names_of(self, ids):
+        names = self.names
+        return [names[i] for i in ids]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+# Read-only node table backed by an encoded name blob, used for graphs loaded from disk.
+# Names are decoded only when asked for, and name lookups binary-search a sorted permutation
+# of the IDs, so opening a graph does not depend on how many nodes it has.
+class MappedNodeTable:
+    def __init__(self, blob, offsets, sorted_ids, encoding="utf-8"):
+        self.blob = blob
+        self.offsets = offsets
+        self.sorted_ids = sorted_ids
+        self.encoding = encoding
+        self.names = _MappedNames(self)
+        self.index = _MappedIndex(self)
+
+    # Function to encode a name the way it is stored in the blob
+    def encode(self, name):
+        return json.dumps(name).encode("utf-8") if self.encoding == "json" else name.encode("utf-8")
+
+    def _raw(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    # Function to decode the name with the given ID
+    def name_of(self, i):
+        raw = self._raw(i)
+        return json.loads(raw) if self.encoding == "json" else raw.decode("utf-8")
+
+    # Function to get the ID of a name (KeyError for unknown names)
+    def id_of(self, name):
+        try:
+            key = self.encode(name)
+        except (AttributeError, TypeError):
+            raise KeyError(name)
+        lo, hi = 0, len(self.sorted_ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw(self.sorted_ids[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.sorted_ids) and self._raw(self.sorted_ids[lo]) == key:
+            return int(self.sorted_ids[lo])
+        raise KeyError(name)
+
+    # Function to translate a sequence of IDs back to names
+    def names_of(self, ids):
+        return [self.name_of(i) for i in ids]
+
+    # Loaded tables cannot grow
+    def intern(self, name):
+        return self.id_of(name)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __contains__(self, name):
+        try:
+            self.id_of(name)
+        except KeyError:
+            return False
+        return True
+
+# Sequence view (ID -> name) of a MappedNodeTable
+class _MappedNames:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.table.names_of(range(*i.indices(len(self.table))))
+        if i < 0:
+            i += len(self.table)
+        if not 0 <= i < len(self.table):
+            raise IndexError(i)
+        return self.table.name_of(i)
+
+    def __iter__(self):
+        return (self.table.name_of(i) for i in range(len(self.table)))
+
+    def __eq__(self, other):
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+# Mapping view (name -> ID) of a MappedNodeTable
+class _MappedIndex:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, name):
+        return self.table.id_of(name)
+
+    def __contains__(self, name):
+        return name in self.table
+
+    def get(self, name, default=None):
+        try:
+            return self.table.id_of(name)
+        except KeyError:
+            return default
+
+# Function to mark arrays read-only so a CompactGraph can be shared safely
+def _freeze(*arrays):
+    for array in arrays:
+        if array is not None and array.flags.writeable:
+            array.flags.writeable = False
+
+# Frozen, array-backed graph in CSR form.
+# Node i's neighbours are targets[offsets[i]:offsets[i + 1]] (sorted), with the matching
+# weights[...] slice; an undirected edge is stored once in each direction. Every CSR slot
+# also records the undirected edge it belongs to (slot_edge), and edge_u/edge_v list each
+# edge once, so per-edge data can be mapped onto the adjacency without a lookup.
+# An optional per-slot boolean mask (up) marks downed links; neighbors() skips them.
+# The topology never changes, but weights can be rewritten in place through set_weights(),
+# which bumps version so caches built on the graph can tell it changed.
+class CompactGraph:
+    def __init__(self, nodes, offsets, targets, weights, slot_edge, edge_u, edge_v, pos=None, directed=False,
+                 up=None, edge_distance=None):
+        self.nodes = nodes if isinstance(nodes, (NodeInterner, MappedNodeTable)) else NodeInterner(nodes)
+        self.names = self.nodes.names
+        self.index = self.nodes.index
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.slot_edge = slot_edge
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.pos = pos  # (n, 2) array of (x, y) / (longitude, latitude), or None
+        self.directed = directed
+        self.up = up
+        self.edge_distance = edge_distance  # Per-edge length (km), aligned with edge_u / edge_v, or None
+        self.version = 0
+        self._slot_keys = None
+        self._reverse = None
+        _freeze(offsets, targets, weights, slot_edge, edge_u, edge_v, pos, up, edge_distance)
+
+    # Function to build a CompactGraph from parallel edge arrays (u, v, weight) over node IDs
+    # nodes is a NodeInterner or a list of names in ID order; up optionally flags each edge as live
+    # and distances keeps each edge's length so latencies can be redrawn later
+    @classmethod
+    def from_edges(cls, nodes, u, v, weights, pos=None, directed=False, weight_dtype=np.float64, up=None,
+                   distances=None):
+        n = len(nodes)
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        weights = np.asarray(weights, dtype=weight_dtype)
+        edge_ids = np.arange(len(u), dtype=np.int64)
+
+        # Undirected edges get one slot per direction
+        if directed:
+            src, dst, slot_weights, slot_edge = u, v, weights, edge_ids
+        else:
+            src = np.concatenate((u, v))
+            dst = np.concatenate((v, u))
+            slot_weights = np.concatenate((weights, weights))
+            slot_edge = np.concatenate((edge_ids, edge_ids))
+
+        # Sort slots by (source, target) and count them per source node
+        order = np.lexsort((dst, src))
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+
+        if pos is not None:
+            pos = np.asarray(pos, dtype=np.float64).reshape(n, 2)
+        slot_edge = slot_edge[order].astype(np.int32 if len(u) < 2 ** 31 else np.int64)
+        slot_up = None if up is None else np.asarray(up, dtype=bool)[slot_edge]
+        if distances is not None:
+            distances = np.asarray(distances, dtype=np.float64)
+        return cls(nodes, offsets, dst[order].astype(np.int32), slot_weights[order], slot_edge,
+                   u.astype(np.int32), v.astype(np.int32), pos, directed, slot_up, distances)
+
+    # Function to convert an existing nx.Graph / nx.DiGraph
+    # IDs assigned at build time (G.graph["nodes"]) are kept; other nodes are numbered in order
+    @classmethod
+    def from_networkx(cls, G, weight="weight", weight_dtype=np.float64):
+        nodes = G.graph.get("nodes")
+        if not isinstance(nodes, NodeInterner) or len(nodes) != G.number_of_nodes() \
+                or any(name not in nodes for name in G):
+            nodes = NodeInterner(G.nodes())
+        names, index = nodes.names, nodes.index
+        m = G.number_of_edges()
+        u = np.empty(m, dtype=np.int64)
+        v = np.empty(m, dtype=np.int64)
+        weights = np.empty(m, dtype=np.float64)
+        up = np.empty(m, dtype=bool)
+        distances = np.empty(m, dtype=np.float64)
+        for k, (a, b, data) in enumerate(G.edges(data=True)):
+            u[k], v[k] = index[a], index[b]
+            weights[k] = data.get(weight, 1.0)
+            up[k] = data.get("up", True)
+            distances[k] = data.get("distance", np.nan)
+
+        positions = [G.nodes[name].get("pos") for name in names]
+        pos = None if any(p is None for p in positions) else np.array(positions, dtype=np.float64)
+        return cls.from_edges(nodes, u, v, weights, pos, G.is_directed(), weight_dtype, None if up.all() else up,
+                              None if np.isnan(distances).any() else distances)
+
+    # Function to convert back to networkx (e.g. for drawing)
+    def to_networkx(self):
+        import networkx as nx
+
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        for i, name in enumerate(self.names):
+            if self.pos is None:
+                G.add_node(name)
+            else:
+                G.add_node(name, pos=tuple(self.pos[i].tolist()))
+        for a, b, w in zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_weights().tolist()):
+            G.add_edge(self.names[a], self.names[b], weight=w)
+        if self.edge_distance is not None:
+            for a, b, d in zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_distance.tolist()):
+                G.edges[self.names[a], self.names[b]]["distance"] = d
+        if self.up is not None:
+            up = np.empty(len(self.edge_u), dtype=bool)
+            up[self.slot_edge] = self.up
+            for a, b in zip(self.edge_u[~up].tolist(), self.edge_v[~up].tolist()):
+                G.edges[self.names[a], self.names[b]]["up"] = False
+        return G
+
+    # Straight-line metric for pos: graphs built from server coordinates carry edge distances in km
+    @property
+    def metric(self):
+        return "haversine" if self.edge_distance is not None else "euclidean"
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return len(self.edge_u)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    # Function to get the integer ID of a node name
+    def node_id(self, name):
+        return self.index[name]
+
+    # Function to translate a path of IDs back to node names
+    def path_names(self, ids):
+        return self.nodes.names_of(ids)
+
+    # Function to get the neighbour IDs and edge weights of node u over live links
+    # (zero-copy slices unless some links are masked down)
+    def neighbors(self, u):
+        start, stop = self.offsets[u], self.offsets[u + 1]
+        if self.up is None:
+            return self.targets[start:stop], self.weights[start:stop]
+        live = self.up[start:stop]
+        return self.targets[start:stop][live], self.weights[start:stop][live]
+
+    # Function to get (source, target, weight) arrays for every live CSR slot
+    def edge_arrays(self):
+        sources = np.repeat(np.arange(len(self.names), dtype=np.int32), np.diff(self.offsets))
+        if self.up is None:
+            return sources, self.targets, self.weights
+        return sources[self.up], self.targets[self.up], self.weights[self.up]
+
+    # Function to get the graph with every live link turned around (for backward searches).
+    # Undirected graphs are their own reverse; a directed graph's reverse is rebuilt after weight changes.
+    def reverse(self):
+        if not self.directed:
+            return self
+        if self._reverse is None or self._reverse[0] != self.version:
+            sources, targets, weights = self.edge_arrays()
+            self._reverse = (self.version, CompactGraph.from_edges(self.nodes, targets, sources, weights, self.pos,
+                                                                   directed=True, weight_dtype=self.weights.dtype))
+        return self._reverse[1]
+
+    # Function to find the CSR slot of edge (u, v), or -1 if it does not exist
+    def slot(self, u, v):
+        start, stop = self.offsets[u], self.offsets[u + 1]
+        k = start + np.searchsorted(self.targets[start:stop], v)
+        return int(k) if k < stop and self.targets[k] == v else -1
+
+    # Function to get the weight of edge (u, v)
+    def edge_weight(self, u, v):
+        k = self.slot(u, v)
+        if k < 0:
+            raise KeyError(f"No edge between {self.names[u]} and {self.names[v]}")
+        return float(self.weights[k])
+
+    # Function to find the CSR slots of many (u, v) pairs at once (-1 where there is no edge)
+    def slots(self, u, v):
+        if self._slot_keys is None:
+            # Slots are sorted by (source, target), so source * n + target is sorted too
+            sources = np.repeat(np.arange(len(self.names), dtype=np.int64), np.diff(self.offsets))
+            self._slot_keys = sources * len(self.names) + self.targets
+        keys = np.asarray(u, dtype=np.int64) * len(self.names) + np.asarray(v, dtype=np.int64)
+        k = np.minimum(np.searchsorted(self._slot_keys, keys), max(len(self._slot_keys) - 1, 0))
+        found = self._slot_keys[k] == keys if len(self._slot_keys) else np.zeros(len(keys), dtype=bool)
+        return np.where(found, k, -1)
+
+    # Function to overwrite the weights of edges (u[k], v[k]) in place and bump the version
+    def set_weights(self, u, v, weights):
+        u = np.atleast_1d(np.asarray(u, dtype=np.int64))
+        v = np.atleast_1d(np.asarray(v, dtype=np.int64))
+        weights = np.broadcast_to(np.asarray(weights, dtype=self.weights.dtype), u.shape)
+        forward = self.slots(u, v)
+        if (forward < 0).any():
+            a, b = u[forward < 0][0], v[forward < 0][0]
+            raise KeyError(f"No edge between {self.names[a]} and {self.names[b]}")
+        self.weights.flags.writeable = True
+        try:
+            self.weights[forward] = weights
+            if not self.directed:
+                self.weights[self.slots(v, u)] = weights
+        finally:
+            self.weights.flags.writeable = False
+        self.version += 1
+
+    # Function to overwrite every edge weight from a per-edge array (aligned with edge_u / edge_v)
+    def set_edge_weights(self, edge_weights):
+        edge_weights = np.asarray(edge_weights, dtype=self.weights.dtype)
+        self.weights.flags.writeable = True
+        try:
+            self.weights[:] = edge_weights[self.slot_edge]
+        finally:
+            self.weights.flags.writeable = False
+        self.version += 1
+
+    # Function to get a graph sharing this one's structure arrays but using other per-edge weights.
+    # up optionally flags each edge as live (aligned with edge_u / edge_v); links already down stay down.
+    def with_edge_weights(self, edge_weights, up=None):
+        weights = np.asarray(edge_weights, dtype=self.weights.dtype)[self.slot_edge]
+        slot_up = self.up
+        if up is not None:
+            slot_up = np.asarray(up, dtype=bool)[self.slot_edge]
+            if self.up is not None:
+                slot_up &= self.up
+            if slot_up.all():
+                slot_up = None
+        view = CompactGraph(self.nodes, self.offsets, self.targets, weights, self.slot_edge, self.edge_u,
+                            self.edge_v, self.pos, self.directed, slot_up, self.edge_distance)
+        view._slot_keys = self._slot_keys
+        return view
+
+    # Function to get one weight per edge, aligned with edge_u / edge_v
+    def edge_weights(self):
+        weights = np.empty(len(self.edge_u), dtype=self.weights.dtype)
+        weights[self.slot_edge] = self.weights
+        return weights
+
+    # Function to save the graph in the binary array-bundle format (see array_store.py):
+    # node table, CSR arrays, weights, link mask, coordinates and edge distances
+    def save(self, path):
+        names = list(self.names)
+        encoding = "utf-8" if all(isinstance(name, str) for name in names) else "json"
+        encode = (lambda name: json.dumps(name).encode("utf-8")) if encoding == "json" else \
+            (lambda name: name.encode("utf-8"))
+        encoded = [encode(name) for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(raw) for raw in encoded], out=name_offsets[1:])
+        sorted_ids = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+
+        arrays = {
+            "offsets": self.offsets, "targets": self.targets, "weights": self.weights,
+            "slot_edge": self.slot_edge, "edge_u": self.edge_u, "edge_v": self.edge_v,
+            "name_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "name_offsets": name_offsets, "name_order": sorted_ids,
+        }
+        for name in ("pos", "up", "edge_distance"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        meta = {"format": "compact-graph", "format_version": 1, "directed": self.directed,
+                "names": encoding, "version": self.version}
+        write_array_bundle(path, arrays, meta)
+
+    # Function to open a graph saved with save(). Every array, including the node table, is a view
+    # into one shared memory map, so processes loading the same file share its pages and opening
+    # it costs the same at any size. The default copy-on-write mode still allows weight updates.
+    @classmethod
+    def load(cls, path, mode="c"):
+        arrays, meta = read_array_bundle(path, mode)
+        if meta.get("format") != "compact-graph":
+            raise ValueError(f"{path} does not contain a compact graph")
+        nodes = MappedNodeTable(arrays["name_blob"], arrays["name_offsets"], arrays["name_order"], meta["names"])
+        graph = cls(nodes, arrays["offsets"], arrays["targets"], arrays["weights"], arrays["slot_edge"],
+                    arrays["edge_u"], arrays["edge_v"], arrays.get("pos"), meta["directed"], arrays.get("up"),
+                    arrays.get("edge_distance"))
+        graph.version = meta.get("version", 0)
+        return graph
+
+    # Total bytes held by the adjacency arrays
+    @property
+    def nbytes(self):
+        arrays = (self.offsets, self.targets, self.weights, self.slot_edge, self.edge_u, self.edge_v, self.pos,
+                  self.up, self.edge_distance)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+# Compact views of versioned nx graphs, reused until the graph's version or size changes
+_compact_views = weakref.WeakKeyDictionary()
+
+# Raised by precomputed indexes (all-pairs tables, hub labels) queried after their graph changed
+class StaleIndexError(Exception):
+    pass
+
+# Function to get the change counter of a graph (CompactGraph.version or G.graph["version"])
+def graph_version(G):
+    if hasattr(G, "version"):
+        return G.version
+    return G.graph.get("version", 0)
+
+# Function to get the key that identifies one state of an nx graph
+def _stamp(G):
+    return (G.graph.get("version", 0), G.number_of_nodes(), G.number_of_edges())
+
+# Function to get an integer-ID CompactGraph for any graph the routing functions accept.
+# Only nx graphs that opt in to versioning (G.graph["version"] set, as build_network does) are
+# converted once and cached; their in-place edits must go through update_graph_weights or bump
+# G.graph["version"]. Any other nx graph is converted on every call, so it is always read live.
+def as_compact_graph(G):
+    if isinstance(G, CompactGraph) or hasattr(G, "node_id"):
+        return G  # Already a routing-native graph (CompactGraph, ImplicitGraph, ...)
+    if "version" not in G.graph:
+        return CompactGraph.from_networkx(G)
+    stamp = _stamp(G)
+    cached = _compact_views.get(G)
+    if cached is None or cached[0] != stamp:
+        cached = _compact_views[G] = (stamp, CompactGraph.from_networkx(G))
+    return cached[1]
+
+# Function to write new weights for edges (u_names[k], v_names[k]) into G in place.
+# Works for CompactGraph and nx graphs alike and bumps the graph's version; an nx graph's
+# cached compact view is patched too, so it does not have to be converted again. Every edge is
+# checked before anything is written, so a KeyError leaves the graph untouched.
+def update_graph_weights(G, u_names, v_names, weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    if isinstance(G, CompactGraph):
+        G.set_weights([G.index[a] for a in u_names], [G.index[b] for b in v_names], weights)
+        return G.version
+
+    u_names, v_names = list(u_names), list(v_names)
+    weights = np.broadcast_to(weights, (len(u_names),))
+    for a, b in zip(u_names, v_names):
+        if not G.has_edge(a, b):
+            raise KeyError(f"No edge between {a} and {b}")
+    stamp = _stamp(G)
+    for a, b, w in zip(u_names, v_names, weights.tolist()):
+        G.edges[a, b]["weight"] = w
+    G.graph["version"] = stamp[0] + 1
+
+    cached = _compact_views.get(G)
+    if cached is not None and cached[0] == stamp:
+        view = cached[1]
+        view.set_weights([view.index[a] for a in u_names], [view.index[b] for b in v_names], weights)
+        _compact_views[G] = (_stamp(G), view)
+    return G.graph["version"]
+
+# Function to save any routable graph (CompactGraph or nx graph) in the binary format
+def save_graph(G, path):
+    as_compact_graph(G).save(path)
+
+# Function to memory-map a graph written by save_graph
+def load_graph(path, mode="c"):
+    return CompactGraph.load(path, mode)
@@ -0,0 +1,337 @@
+import heapq
+import time
+import numpy as np
+from algorithms import RouteResult
+from compact_graph import StaleIndexError, as_compact_graph, graph_version
+
+# Hierarchy edges joining the neighbours of each node are looked up once and kept if they fit in
+# this many bytes; above it, every customization looks them up again
+TRIANGLE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Function to eliminate every node, joining the remaining neighbours of each eliminated node
+# pairwise. Without an order, the node with the fewest remaining neighbours goes next (minimum
+# degree), which keeps the added edges few. Returns the order and, per node, the neighbours it
+# still had when it was eliminated: its edges towards higher-ranked nodes.
+def _eliminate(n, u, v, order=None):
+    adjacent = [set() for _ in range(n)]
+    for a, b in zip(u, v):
+        if a != b:
+            adjacent[a].add(b)
+            adjacent[b].add(a)
+
+    upward = [None] * n
+    if order is None:
+        order = []
+        heap = [(len(neighbours), x) for x, neighbours in enumerate(adjacent)]
+        heapq.heapify(heap)
+        while heap:
+            degree, x = heapq.heappop(heap)
+            if upward[x] is not None or degree != len(adjacent[x]):
+                continue  # Already eliminated, or queued before its degree changed
+            order.append(x)
+            upward[x] = _eliminate_node(adjacent, x)
+            for y in upward[x]:
+                heapq.heappush(heap, (len(adjacent[y]), y))
+    else:
+        for x in order:
+            upward[x] = _eliminate_node(adjacent, x)
+    return np.array(order, dtype=np.int64), upward
+
+# Function to remove node x from the remaining graph, connecting its neighbours to each other
+def _eliminate_node(adjacent, x):
+    neighbours = adjacent[x]
+    for y in neighbours:
+        adjacent[y].discard(x)
+        adjacent[y].update(neighbours)
+        adjacent[y].discard(y)
+    adjacent[x] = set()
+    return neighbours
+
+# Function to expand a hierarchy edge a -> b into the original nodes it stands for.
+# topology is (keys, rank, middle_forward, middle_backward) as kept by ContractionHierarchy.
+def _unpack(topology, a, b):
+    keys, rank, middle_forward, middle_backward = topology
+    n = len(rank)
+    nodes = [a]
+    stack = [(a, b)]
+    while stack:
+        u, x = stack.pop()
+        if rank[u] < rank[x]:
+            v = middle_forward[np.searchsorted(keys, u * n + rank[x])]
+        else:
+            v = middle_backward[np.searchsorted(keys, x * n + rank[u])]
+        if v < 0:
+            nodes.append(x)
+        else:
+            stack.append((int(v), x))
+            stack.append((u, int(v)))
+    return nodes
+
+# Function to lower the weights of the given hierarchy edges to candidate where that is cheaper,
+# recording node v as the one the improved edges now run through
+def _relax(weights, middle, edges, candidate, v):
+    better = candidate < weights[edges]
+    weights[edges[better]] = candidate[better]
+    middle[edges[better]] = v
+
+# Function to lower the edges v -> ups[j] (weights[start + j]) to the cheapest v -> ups[i] -> ups[j],
+# given the distances between the ups. An edge is kept for queries only if no neighbour strictly
+# closer to v reaches ups[j] as cheaply, which rules out two edges standing in for each other.
+def _tighten(weights, middle, keep, start, ups, between):
+    direct = weights[start:start + len(ups)]
+    through = direct[:, None] + between
+    via = through.argmin(axis=0)
+    exact = through[via, np.arange(len(ups))]
+    better = np.flatnonzero(exact < direct)
+    weights[start + better] = exact[better]
+    middle[start + better] = ups[via[better]]
+    covered = (exact[:, None] + between <= exact) & (exact[:, None] < exact)
+    keep[start:start + len(ups)] = ~covered.any(axis=0)
+
+# Customizable contraction hierarchy over a graph's links. Preprocessing is split in two:
+# - The topology depends only on which links exist. Nodes are ranked (minimum degree by default)
+#   and eliminated lowest first; eliminating a node joins all its remaining neighbours, so every
+#   path between two nodes has a counterpart that first climbs and then descends in rank.
+#   Each node keeps its edges towards higher-ranked nodes in CSR arrays sorted by rank.
+# - customize() fits the current weights to that topology. Every hierarchy edge starts at its
+#   link's weight (inf where there is no live link). Nodes are then visited lowest first, each
+#   one relaxing the edges between its higher-ranked neighbours through itself, and once more
+#   highest first, which makes every edge the exact distance between its ends and finds the edges
+#   another path matches. These are vectorized passes over the fixed topology with no searches,
+#   valid for any weights, so they are all that runs when latencies change. Each edge remembers
+#   the node it runs through, for unpacking paths.
+# A query only follows edges towards higher-ranked nodes, from both ends, and skips matched edges.
+# Queries raise StaleIndexError once the graph's weights change, until customize() runs; with
+# auto_customize=True the next query runs it instead (counted in customizations and customize_seconds).
+class ContractionHierarchy:
+    def __init__(self, G, order=None, auto_customize=False):
+        self.graph = as_compact_graph(G)
+        if not hasattr(self.graph, "edge_arrays"):
+            raise TypeError("Contraction hierarchies need a graph with explicit edges")
+        self.auto_customize = auto_customize
+        self.customizations = 0
+        self.customize_seconds = 0.0
+
+        start_time = time.time()
+        cg = self.graph
+        n = cg.number_of_nodes()
+        given = None if order is None else np.asarray(order, dtype=np.int64).tolist()
+        self.order, upward = _eliminate(n, cg.edge_u.tolist(), cg.edge_v.tolist(), given)
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[self.order] = np.arange(n)
+        rank = self.rank.tolist()
+        upward = [sorted(neighbours, key=rank.__getitem__) for neighbours in upward]
+
+        self.up_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(neighbours) for neighbours in upward], out=self.up_offsets[1:])
+        up_targets = np.fromiter((x for neighbours in upward for x in neighbours), dtype=np.int64,
+                                 count=int(self.up_offsets[-1]))
+        # Edge (u, x) with u ranked below x is found by searching u * n + rank[x], which is sorted
+        self._sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.up_offsets))
+        self.keys = self._sources * n + self.rank[up_targets]
+        self.up_targets = up_targets.astype(np.int32)
+
+        # Every pair of a node's k higher-ranked neighbours is joined by a hierarchy edge. Pairs are
+        # listed column by column, so the pairs among the first k neighbours are the first
+        # k * (k - 1) / 2 entries for any k; the joining edges are looked up once if they fit.
+        degrees = np.diff(self.up_offsets)
+        widest = int(degrees.max()) if n else 0
+        self._pair_b = np.repeat(np.arange(widest), np.arange(widest))
+        self._pair_a = np.arange(len(self._pair_b)) - self._pair_b * (self._pair_b - 1) // 2
+        self._triangle_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degrees * (degrees - 1) // 2, out=self._triangle_offsets[1:])
+        self._joining = None
+        if self._triangle_offsets[-1] * 4 <= TRIANGLE_CACHE_BYTES:
+            found = np.empty(self._triangle_offsets[-1], dtype=np.int32)
+            for v, start, stop, a, b, joining in self._triangles():
+                found[self._triangle_offsets[v]:self._triangle_offsets[v + 1]] = joining
+            self._joining = found
+        self.preprocess_seconds = time.time() - start_time
+        self.customize()
+
+    # Function to fit the hierarchy's edge weights to the graph's current weights
+    def customize(self):
+        start_time = time.time()
+        cg = self.graph
+        n = cg.number_of_nodes()
+        rank = self.rank
+        sources, targets, weights = cg.edge_arrays()
+        sources = sources.astype(np.int64)
+        targets = targets.astype(np.int64)
+        lower = rank[sources] < rank[targets]
+        low = np.where(lower, sources, targets)
+        high = np.where(lower, targets, sources)
+        edges = np.searchsorted(self.keys, low * n + rank[high])
+
+        # forward[e] is the weight of edge e upwards (lower to higher rank), backward[e] downwards
+        m = len(self.keys)
+        self.forward = np.full(m, np.inf)
+        np.minimum.at(self.forward, edges[lower], weights[lower])
+        self.middle_forward = np.full(m, -1, dtype=np.int32)
+        if cg.directed:
+            downward = ~lower & (sources != targets)
+            self.backward = np.full(m, np.inf)
+            np.minimum.at(self.backward, edges[downward], weights[downward])
+            self.middle_backward = np.full(m, -1, dtype=np.int32)
+        else:
+            self.backward = self.forward
+            self.middle_backward = self.middle_forward
+
+        # Lowest first: the cheapest path between two neighbours through nodes ranked below them
+        for v, start, stop, a, b, joining in self._triangles():
+            up, down = self.forward[start:stop], self.backward[start:stop]
+            _relax(self.forward, self.middle_forward, joining, down[a] + up[b], v)
+            if cg.directed:
+                _relax(self.backward, self.middle_backward, joining, down[b] + up[a], v)
+
+        # Then highest first, make every edge the shortest distance between its ends (edges between
+        # higher-ranked nodes are exact by then) and flag the edges some other neighbour can stand in for
+        keep_forward = np.ones(m, dtype=bool)
+        keep_backward = np.ones(m, dtype=bool) if cg.directed else keep_forward
+        for v, start, stop, a, b, joining in self._triangles(reverse=True):
+            ups = self.up_targets[start:stop]
+            between = np.full((stop - start, stop - start), np.inf)  # between[i, j]: ups[i] -> ups[j]
+            np.fill_diagonal(between, 0.0)
+            between[a, b] = self.forward[joining]
+            between[b, a] = self.backward[joining]
+            _tighten(self.forward, self.middle_forward, keep_forward, start, ups, between)
+            if cg.directed:
+                _tighten(self.backward, self.middle_backward, keep_backward, start, ups, between.T)
+        keep_forward &= np.isfinite(self.forward)
+        if cg.directed:
+            keep_backward &= np.isfinite(self.backward)
+        self.up_forward = self._search_edges(self.forward, keep_forward)  # Edges v -> x towards higher-ranked x
+        self.up_backward = self._search_edges(self.backward, keep_backward)  # Edges x -> v, as (x, w) at v
+
+        self.version = graph_version(cg)
+        self.customizations += 1
+        self.customize_seconds += time.time() - start_time
+
+    # Function to yield, for every node v with two or more higher-ranked neighbours (lowest rank
+    # first), its up-edge range start:stop, the index pairs a, b of its neighbours (a ranked lower)
+    # and the hierarchy edges joining each pair
+    def _triangles(self, reverse=False):
+        n = len(self.rank)
+        for v in (self.order[::-1] if reverse else self.order).tolist():
+            start, stop = self.up_offsets[v], self.up_offsets[v + 1]
+            if stop - start < 2:
+                continue
+            count = (stop - start) * (stop - start - 1) // 2
+            a, b = self._pair_a[:count], self._pair_b[:count]
+            if self._joining is not None:
+                first = self._triangle_offsets[v]
+                joining = self._joining[first:first + count]
+            else:
+                ups = self.up_targets[start:stop].astype(np.int64)
+                joining = np.searchsorted(self.keys, ups[a] * n + self.rank[ups[b]])
+            yield v, start, stop, a, b, joining
+
+    # Function to list the up-edges flagged in keep as (x, w) pairs per node, for queries
+    def _search_edges(self, weights, keep):
+        offsets = np.zeros(len(self.rank) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._sources[keep], minlength=len(self.rank)), out=offsets[1:])
+        edges = list(zip(self.up_targets[keep].tolist(), weights[keep].tolist()))
+        offsets = offsets.tolist()
+        return [edges[offsets[v]:offsets[v + 1]] for v in range(len(self.rank))]
+
+    # (keys, rank, middle_forward, middle_backward), what _unpack needs to expand hierarchy edges
+    @property
+    def topology(self):
+        return self.keys, self.rank, self.middle_forward, self.middle_backward
+
+    # Number of hierarchy edges
+    @property
+    def edge_count(self):
+        return len(self.keys)
+
+    # Function to check whether the graph changed since the hierarchy was customized
+    def is_current(self):
+        return graph_version(self.graph) == self.version
+
+    # Function to bring the hierarchy up to date before a query (or refuse, without auto_customize)
+    def _check_current(self):
+        if self.is_current():
+            return
+        if not self.auto_customize:
+            raise StaleIndexError("Graph changed since the hierarchy was customized; call customize()")
+        self.customize()
+
+    # Function to run the bidirectional upward search between node IDs.
+    # Returns (cost, meeting node, forward predecessors, backward successors, nodes settled).
+    def _search(self, s, t):
+        upward = (self.up_forward, self.up_backward)
+        dist = ({s: 0.0}, {t: 0.0})
+        pred = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best, meet = (0.0, s) if s == t else (float('inf'), -1)
+        expanded = 0
+        while True:
+            forward_key = heaps[0][0][0] if heaps[0] else float('inf')
+            backward_key = heaps[1][0][0] if heaps[1] else float('inf')
+            if min(forward_key, backward_key) >= best:
+                break  # Neither side can still find a cheaper meeting point
+            side = 0 if forward_key <= backward_key else 1
+            d, u = heapq.heappop(heaps[side])
+            if d > dist[side][u]:
+                continue
+            expanded += 1
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            for x, w in upward[side][u]:
+                nd = d + w
+                if nd < dist[side].get(x, float('inf')):
+                    dist[side][x] = nd
+                    pred[side][x] = u
+                    heapq.heappush(heaps[side], (nd, x))
+        return best, meet, pred[0], pred[1], expanded
+
+    # Function to get the shortest-path latency between two nodes (inf if unreachable)
+    def latency(self, source, target):
+        self._check_current()
+        return self._search(self.graph.node_id(source), self.graph.node_id(target))[0]
+
+    # Function to find the shortest path between two nodes as a RouteResult (None if unreachable)
+    def route(self, source, target):
+        self._check_current()
+        s, t = self.graph.node_id(source), self.graph.node_id(target)
+        cost, meet, forward, backward, expanded = self._search(s, t)
+        if meet < 0:
+            return None
+
+        # Hierarchy path: s .. meet along forward predecessors, then meet .. t along backward ones
+        hierarchy = [meet]
+        while hierarchy[0] != s:
+            hierarchy.insert(0, forward[hierarchy[0]])
+        while hierarchy[-1] != t:
+            hierarchy.append(backward[hierarchy[-1]])
+        ids = [s]
+        for a, b in zip(hierarchy[:-1], hierarchy[1:]):
+            ids.extend(_unpack(self.topology, a, b)[1:])
+
+        node_ids = np.array(ids, dtype=np.int64)
+        hop_weights = self.graph.weights[self.graph.slots(node_ids[:-1], node_ids[1:])].astype(np.float64)
+        return RouteResult(self.graph.path_names(ids), node_ids, hop_weights, "Contraction Hierarchy", expanded)
+
+# Function to build a contraction hierarchy for a graph
+def build_contraction_hierarchy(G, order=None, auto_customize=False):
+    return ContractionHierarchy(G, order, auto_customize)
+
+# Contraction Hierarchy Algorithm: preprocesses each graph once on first use and customizes it
+# again after weight changes, then answers queries with a bidirectional upward search. The
+# hierarchy is kept on the compact graph itself, so it goes away with the graph; an nx graph with
+# no G.graph["version"] gets a fresh compact graph, and so a fresh hierarchy, on every call.
+def contraction_hierarchy_algorithm(G, source, target):
+    cg = as_compact_graph(G)
+    if not hasattr(cg, "edge_arrays"):
+        print("Contraction hierarchies need a graph with explicit edges.")
+        return None
+    hierarchy = getattr(cg, "_contraction_hierarchy", None)
+    if hierarchy is None:
+        hierarchy = cg._contraction_hierarchy = ContractionHierarchy(cg)
+    elif not hierarchy.is_current():
+        hierarchy.customize()
+    route = hierarchy.route(source, target)
+    if route is None:
+        print(f"No path exists between {source} and {target} using Contraction Hierarchy.")
+    return route
@@ -0,0 +1,233 @@
+import glob
+import hashlib
+import os
+import numpy as np
+
+# Mean Earth radius in kilometers (IUGG), used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Function to split a {name: (lat, lon)} mapping (or a ServerCatalog) into a name list and an (n, 2) array
+def server_arrays(servers):
+    if hasattr(servers, "coords"):
+        return list(servers.names), servers.coords
+    names = list(servers)
+    coords = np.array([servers[name] for name in names], dtype=np.float64).reshape(-1, 2)
+    return names, coords
+
+# Function to compute haversine distances (km) between broadcastable lat/lon arrays in degrees
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) * 0.5) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# Number of candidate pairs measured per batch when walking the spatial index
+PAIR_CHUNK = 1 << 22
+
+# Smallest spatial-index cell edge, as a chord on the unit sphere
+MIN_CELL = 4e-6
+
+# Function to convert lat/lon degrees into unit vectors on the sphere
+def unit_vectors(coords):
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+# Function to convert a great-circle radius (km) into the matching straight-line chord on the unit sphere
+def chord_length(radius_km):
+    angle = min(radius_km / EARTH_RADIUS_KM, np.pi)
+    return 2.0 * np.sin(angle * 0.5)
+
+# Function to expand matching cell pairs into point pairs, given per-cell start offsets and sizes
+def _cross_pairs(starts_a, counts_a, starts_b, counts_b):
+    sizes = counts_a * counts_b
+    total = int(sizes.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    block = np.repeat(np.arange(len(sizes)), sizes)
+    local = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    width = counts_b[block]
+    return starts_a[block] + local // width, starts_b[block] + local % width
+
+# Spherical spatial index: points are bucketed into 3-D cubic cells whose edge equals the
+# chord of the search radius, so any two points within the radius share a cell or touch cells.
+# Working in 3-D avoids the pole and antimeridian special cases of a lat/lon grid.
+class SphericalGridIndex:
+    # Offsets to the 13 "forward" neighbour cells; together with the cell itself they cover each pair once
+    FORWARD_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                       if (dx, dy, dz) > (0, 0, 0)]
+
+    def __init__(self, coords, radius_km):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.radius_km = float(radius_km)
+        # Cells never shrink below ~25 m so the packed cell keys stay within int64
+        self.cell = max(chord_length(self.radius_km) * (1.0 + 1e-9), MIN_CELL)
+
+        cells = np.floor(unit_vectors(self.coords) / self.cell).astype(np.int64)
+        self._span = int(np.ceil(2.0 / self.cell)) + 4
+        self._shift = self._span // 2
+        keys = self._encode(cells)
+
+        # Points sorted by cell key; each occupied cell is a contiguous run
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            sorted_keys, return_index=True, return_counts=True)
+
+    # Function to pack integer cell coordinates into a single sortable key
+    def _encode(self, cells):
+        shifted = cells + self._shift
+        return (shifted[..., 0] * self._span + shifted[..., 1]) * self._span + shifted[..., 2]
+
+    # Function to locate the occupied cells matching a set of keys (missing cells get count 0)
+    def _lookup(self, keys):
+        pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        found = self.cell_keys[pos] == keys
+        return self.cell_starts[pos], np.where(found, self.cell_counts[pos], 0)
+
+    # Function to yield candidate pairs (as positions into self.order) in bounded chunks
+    def _iter_candidates(self, chunk_size):
+        if len(self.cell_keys) == 0:
+            return
+        starts, counts = self.cell_starts, self.cell_counts
+
+        # Pairs inside the same cell: keep only a < b
+        for lo, hi in self._chunk_bounds(counts * counts, chunk_size):
+            a, b = _cross_pairs(starts[lo:hi], counts[lo:hi], starts[lo:hi], counts[lo:hi])
+            keep = a < b
+            yield a[keep], b[keep]
+
+        # Pairs between a cell and each of its forward neighbours
+        span = self._span
+        for dx, dy, dz in self.FORWARD_OFFSETS:
+            delta = (dx * span + dy) * span + dz
+            neighbour_starts, neighbour_counts = self._lookup(self.cell_keys + delta)
+            hit = np.nonzero(neighbour_counts)[0]
+            sizes = counts[hit] * neighbour_counts[hit]
+            for lo, hi in self._chunk_bounds(sizes, chunk_size):
+                sel = hit[lo:hi]
+                yield _cross_pairs(starts[sel], counts[sel], neighbour_starts[sel], neighbour_counts[sel])
+
+    # Function to split a run of block sizes into consecutive ranges holding about chunk_size items
+    @staticmethod
+    def _chunk_bounds(sizes, chunk_size):
+        if len(sizes) == 0:
+            return
+        cumulative = np.cumsum(sizes)
+        lo = 0
+        while lo < len(sizes):
+            base = cumulative[lo - 1] if lo else 0
+            hi = int(np.searchsorted(cumulative, base + chunk_size, side="right"))
+            hi = max(hi, lo + 1)
+            yield lo, hi
+            lo = hi
+
+    # Function to yield (i, j, distance) arrays with i < j for every pair within the radius
+    def iter_pairs(self, chunk_size=PAIR_CHUNK):
+        lat, lon = self.coords[:, 0], self.coords[:, 1]
+        for a, b in self._iter_candidates(chunk_size):
+            i, j = self.order[a], self.order[b]
+            i, j = np.minimum(i, j), np.maximum(i, j)
+            distance = haversine_km(lat[i], lon[i], lat[j], lon[j])
+            keep = distance <= self.radius_km
+            yield i[keep], j[keep], distance[keep]
+
+    # Function to collect every pair within the radius, sorted by (i, j)
+    def query_pairs(self, chunk_size=PAIR_CHUNK):
+        chunks = list(self.iter_pairs(chunk_size))
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        i, j, distance = (np.concatenate(parts) for parts in zip(*chunks))
+        order = np.lexsort((j, i))
+        return i[order], j[order], distance[order]
+
+    # Function to find every indexed point within radius_km (default: the index radius) of a location
+    def query_point(self, lat, lon, radius_km=None):
+        radius_km = self.radius_km if radius_km is None else min(float(radius_km), self.radius_km)
+        if len(self.cell_keys) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        cell = np.floor(unit_vectors([lat, lon])[0] / self.cell).astype(np.int64)
+        offsets = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+        starts, counts = self._lookup(self._encode(cell + offsets))
+        if counts.sum() == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ids = self.order[np.concatenate([np.arange(s, s + c) for s, c in zip(starts, counts) if c])]
+        distance = haversine_km(lat, lon, self.coords[ids, 0], self.coords[ids, 1])
+        keep = distance <= radius_km
+        return ids[keep], distance[keep]
+
+# Function to find every unordered pair within the threshold using the spatial index
+# method="geodesic" filters the index candidates with geopy's ellipsoidal distance instead
+def threshold_pairs(coords, threshold, method="haversine"):
+    if method == "haversine":
+        return SphericalGridIndex(coords, threshold).query_pairs()
+    if method != "geodesic":
+        raise ValueError(f"Unknown distance method: {method}")
+
+    from geopy.distance import geodesic
+
+    # WGS-84 distances stay within 0.7% of the spherical ones, so widen the candidate radius to match
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    i, j, _ = SphericalGridIndex(coords, threshold * 1.007).query_pairs()
+    distance = np.array([geodesic(coords[a], coords[b]).kilometers for a, b in zip(i.tolist(), j.tolist())],
+                        dtype=np.float64)
+    keep = distance <= threshold
+    return i[keep], j[keep], distance[keep]
+
+# On-disk layout of a cached pair table: one fixed-size record per unordered pair
+PAIR_DTYPE = np.dtype([("i", "<i4"), ("j", "<i4"), ("distance", "<f8")])
+
+# Function to fingerprint a catalog by its server names, coordinates and distance method
+def catalog_key(names, coords, method="haversine"):
+    digest = hashlib.sha256(method.encode())
+    for name in names:
+        digest.update(name.encode("utf-8") + b"\0")
+    digest.update(np.ascontiguousarray(coords, dtype="<f8").tobytes())
+    return digest.hexdigest()[:20]
+
+# Function to list the cached pair tables for a catalog key as (radius, path) tuples
+def _cached_tables(cache_dir, key):
+    tables = []
+    for path in glob.glob(os.path.join(cache_dir, f"distances-{key}-r*.npy")):
+        radius = os.path.basename(path)[len(f"distances-{key}-r"):-len(".npy")]
+        try:
+            tables.append((float(radius), path))
+        except ValueError:
+            continue
+    return sorted(tables)
+
+# Function to memory-map the narrowest cached pair table covering the threshold
+# Returns (i, j, distance, radius) as zero-copy views, or None when nothing usable is cached
+def load_cached_pairs(cache_dir, key, threshold):
+    for radius, path in _cached_tables(cache_dir, key):
+        if radius < threshold:
+            continue
+        try:
+            table = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            continue  # Truncated or foreign file; it will be rewritten
+        if table.dtype != PAIR_DTYPE:
+            continue
+        return table["i"], table["j"], table["distance"], radius
+    return None
+
+# Function to persist a pair table for a catalog key, replacing narrower tables for the same key
+def save_cached_pairs(cache_dir, key, radius, i, j, distances):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"distances-{key}-r{float(radius)!r}.npy")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    table = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=PAIR_DTYPE, shape=(len(i),))
+    table["i"], table["j"], table["distance"] = i, j, distances
+    table.flush()
+    del table
+    os.replace(tmp_path, path)  # Readers only ever see complete files
+
+    for old_radius, old_path in _cached_tables(cache_dir, key):
+        if old_radius < radius:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return path
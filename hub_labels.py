@@ -0,0 +1,220 @@
+import hashlib
+import multiprocessing
+import os
+import numpy as np
+from algorithms import RouteResult
+from array_store import read_array_bundle, write_array_bundle
+from compact_graph import StaleIndexError, as_compact_graph, graph_version
+from contraction import ContractionHierarchy, _unpack
+
+# Upward edge lists and node order shared with worker processes (set once per worker by the pool initializer)
+_worker_hierarchy = None
+
+def _init_worker(upward, order):
+    global _worker_hierarchy
+    _worker_hierarchy = (upward, order)
+
+# Function to combine label pieces into one label: the cheapest entry per hub, sorted by hub ID.
+# best (all inf) and parent_of are per-node scratch arrays; best is left all inf again.
+def _combine(pieces, best, parent_of):
+    hubs, distances, parents = (np.concatenate(column) for column in zip(*pieces))
+    np.minimum.at(best, hubs, distances)
+    cheapest = distances == best[hubs]
+    parent_of[hubs[cheapest]] = parents[cheapest]
+    hubs = np.unique(hubs)
+    label = (hubs, best[hubs], parent_of[hubs])
+    best[hubs] = np.inf
+    return label
+
+# Function to compute the labels of every node in one direction (0 forward, 1 backward), keeping
+# only the hubs h with h % classes == k. Nodes go highest rank first, so a node's label is the
+# cheapest combination of one of its upward edges v -> x with x's finished label: each entry is
+# (hub, distance, the hub before it on the way up, -1 for v itself), and hub x itself gets v as
+# its parent. Returns (side, entries per node, hubs, distances, parents) in node ID order.
+def _label_class(task):
+    side, k, classes = task
+    upward, order = _worker_hierarchy[0][side], _worker_hierarchy[1]
+    empty = (np.zeros(0, dtype=np.int32), np.zeros(0), np.zeros(0, dtype=np.int32))
+    labels = [empty] * len(order)
+    best = np.full(len(order), np.inf)
+    parent_of = np.empty(len(order), dtype=np.int32)
+    for v in reversed(order):
+        pieces = []
+        if v % classes == k:
+            pieces.append((np.array([v], dtype=np.int32), np.zeros(1), np.array([-1], dtype=np.int32)))
+        for x, w in upward[v]:
+            hubs, distances, parents = labels[x]
+            if len(hubs):
+                pieces.append((hubs, distances + w, np.where(hubs == x, v, parents).astype(np.int32)))
+        if pieces:
+            labels[v] = pieces[0] if len(pieces) == 1 else _combine(pieces, best, parent_of)
+    counts = np.array([len(label[0]) for label in labels], dtype=np.int64)
+    return (side, counts) + tuple(np.concatenate([label[j] for label in labels]) for j in range(3))
+
+# Function to fingerprint the links and weights labels were built for
+def _fingerprint(graph):
+    digest = hashlib.sha256()
+    for array in (graph.offsets, graph.targets, graph.weights, graph.up):
+        if array is not None:
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+# Function to find the best common hub of two sorted labels; returns (distance, hub), or (inf, -1)
+def _merge(hubs_a, dist_a, hubs_b, dist_b):
+    common, ia, ib = np.intersect1d(hubs_a, hubs_b, assume_unique=True, return_indices=True)
+    if not len(ia):
+        return float('inf'), -1
+    through = dist_a[ia] + dist_b[ib]
+    k = int(np.argmin(through))
+    return float(through[k]), int(common[k])
+
+# Hub labels (2-hop cover): every node v has a forward label of (hub, d(v, hub)) pairs and a
+# backward label of (hub, d(hub, v)) pairs, such that every shortest s-t path passes through a
+# hub in both the forward label of s and the backward label of t. The labels are the upward search
+# spaces of a contraction hierarchy. d(s, t) is one merge of two sorted arrays. Each entry also
+# keeps its parent hub, and the hierarchy's edges are kept with the node each one runs through,
+# so a path is rebuilt from the meeting hub without touching the hierarchy itself. Labels sit in CSR
+# arrays that save() writes as an array bundle and load() memory-maps, so they need not fit in RAM.
+# Undirected graphs share one set of labels for both directions. Queries raise StaleIndexError
+# once the graph's weights change, and so does loading labels saved for other weights; build the
+# labels again with build_hub_labels.
+class HubLabels:
+    def __init__(self, graph, arrays, version=None):
+        self.graph = graph
+        self.forward = tuple(arrays[f"forward_{part}"] for part in ("offsets", "hubs", "dist", "parent"))
+        if "backward_offsets" in arrays:
+            self.backward = tuple(arrays[f"backward_{part}"] for part in ("offsets", "hubs", "dist", "parent"))
+        else:
+            self.backward = self.forward
+        # Hierarchy edges as (keys, rank, middle_forward, middle_backward), see contraction._unpack
+        middle_forward = arrays["middle_forward"]
+        self.topology = (arrays["hierarchy_keys"], arrays["rank"], middle_forward,
+                         arrays["middle_backward"] if "middle_backward" in arrays else middle_forward)
+        self.version = graph_version(graph) if version is None else version
+
+    # Function to check whether the graph changed since the labels were built
+    def is_current(self):
+        return graph_version(self.graph) == self.version
+
+    def _check_current(self):
+        if not self.is_current():
+            raise StaleIndexError("Graph changed since the hub labels were built; run build_hub_labels again")
+
+    # Function to get the label of node v in one direction as (hubs, distances) views
+    @staticmethod
+    def _slice(label, v):
+        offsets, hubs, distances, _ = label
+        start, stop = offsets[v], offsets[v + 1]
+        return hubs[start:stop], distances[start:stop]
+
+    # Function to get the parent of hub h in node v's label
+    @staticmethod
+    def _parent(label, v, h):
+        offsets, hubs, _, parents = label
+        start, stop = offsets[v], offsets[v + 1]
+        return int(parents[start + np.searchsorted(hubs[start:stop], h)])
+
+    # Function to get (latency, meeting hub) between node IDs s and t ((inf, -1) if unreachable)
+    def _meet(self, s, t):
+        return _merge(*self._slice(self.forward, s), *self._slice(self.backward, t))
+
+    # Function to get the shortest-path latency between two nodes (inf if unreachable)
+    def latency(self, source, target):
+        self._check_current()
+        return self._meet(self.graph.node_id(source), self.graph.node_id(target))[0]
+
+    # Function to rebuild the shortest path as a RouteResult (None if unreachable): follow parent
+    # hubs from the meeting hub back to s and on to t, then unpack the shortcuts on the way;
+    # expanded counts the hierarchy edges unpacked
+    def route(self, source, target):
+        self._check_current()
+        s, t = self.graph.node_id(source), self.graph.node_id(target)
+        _, hub = self._meet(s, t)
+        if hub < 0:
+            return None
+        hierarchy = [hub]
+        while hierarchy[0] != s:
+            hierarchy.insert(0, self._parent(self.forward, s, hierarchy[0]))
+        while hierarchy[-1] != t:
+            hierarchy.append(self._parent(self.backward, t, hierarchy[-1]))
+        ids = [s]
+        for a, b in zip(hierarchy[:-1], hierarchy[1:]):
+            ids.extend(_unpack(self.topology, a, b)[1:])
+
+        node_ids = np.array(ids, dtype=np.int64)
+        hop_weights = self.graph.weights[self.graph.slots(node_ids[:-1], node_ids[1:])].astype(np.float64)
+        return RouteResult(self.graph.path_names(ids), node_ids, hop_weights, "Hub labels", len(hierarchy) - 1)
+
+    # Function to get the number of (hub, distance) entries over all labels
+    def size(self):
+        size = len(self.forward[1])
+        return size if self.backward is self.forward else size + len(self.backward[1])
+
+    # Function to save the labels as an array bundle (see array_store.py), with a fingerprint of the
+    # graph's links and weights that load() checks
+    def save(self, path):
+        self._check_current()
+        parts = ("offsets", "hubs", "dist", "parent")
+        arrays = {f"forward_{part}": array for part, array in zip(parts, self.forward)}
+        if self.backward is not self.forward:
+            arrays.update({f"backward_{part}": array for part, array in zip(parts, self.backward)})
+        keys, rank, middle_forward, middle_backward = self.topology
+        arrays.update(hierarchy_keys=keys, rank=rank, middle_forward=middle_forward)
+        if middle_backward is not middle_forward:
+            arrays["middle_backward"] = middle_backward
+        write_array_bundle(path, arrays, {"nodes": self.graph.number_of_nodes(),
+                                          "fingerprint": _fingerprint(self.graph)})
+
+    # Function to memory-map labels saved for graph G (read-only unless mode says otherwise).
+    # Raises StaleIndexError if G's links or weights differ from the ones the labels were built for.
+    @classmethod
+    def load(cls, path, G, mode="r"):
+        graph = as_compact_graph(G)
+        arrays, meta = read_array_bundle(path, mode)
+        if meta["nodes"] != graph.number_of_nodes():
+            raise ValueError(f"{path} holds labels for {meta['nodes']} nodes, the graph has {graph.number_of_nodes()}")
+        if meta.get("fingerprint") != _fingerprint(graph):
+            raise StaleIndexError(f"{path} holds labels for other link weights; run build_hub_labels again")
+        return cls(graph, arrays)
+
+# Function to build hub labels for a graph. The contraction hierarchy is built first (or taken
+# from hierarchy, and customized if the weights changed). Labels are then computed top-down, each
+# from the labels above it, with the hubs split over worker processes (processes=1 runs in-process).
+def build_hub_labels(G, processes=None, hierarchy=None):
+    graph = as_compact_graph(G)
+    if hierarchy is None or hierarchy.graph is not graph:
+        hierarchy = ContractionHierarchy(graph)
+    elif not hierarchy.is_current():
+        hierarchy.customize()
+    upward = (hierarchy.up_forward, hierarchy.up_backward)
+    order = hierarchy.order.tolist()
+    n = graph.number_of_nodes()
+    sides = (0, 1) if graph.directed else (0,)
+    processes = processes or os.cpu_count() or 1
+    tasks = [(side, k, processes) for side in sides for k in range(processes)]
+
+    if processes == 1:
+        _init_worker(upward, order)
+        results = list(map(_label_class, tasks))
+    else:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(upward, order)) as pool:
+            results = list(pool.imap_unordered(_label_class, tasks))
+
+    arrays = {}
+    for side, name in zip(sides, ("forward", "backward")):
+        parts = [result for result in results if result[0] == side]
+        nodes = np.concatenate([np.repeat(np.arange(n), part[1]) for part in parts])
+        hubs, distances, parents = (np.concatenate([part[j] for part in parts]) for j in range(2, 5))
+        entries = np.lexsort((hubs, nodes))
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=n), out=offsets[1:])
+        arrays[f"{name}_offsets"] = offsets
+        arrays[f"{name}_hubs"] = hubs[entries]
+        arrays[f"{name}_dist"] = distances[entries]
+        arrays[f"{name}_parent"] = parents[entries]
+
+    keys, rank, middle_forward, middle_backward = hierarchy.topology
+    arrays.update(hierarchy_keys=keys, rank=rank, middle_forward=middle_forward)
+    if graph.directed:
+        arrays["middle_backward"] = middle_backward
+    return HubLabels(graph, arrays, hierarchy.version)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+import numpy as np
+from compact_graph import NodeInterner
+from distance_engine import SphericalGridIndex, server_arrays
+from network_model import DEFAULT_THRESHOLD, FailureModel, LatencyModel, servers
+
+# Neighbour lists kept by default before the least recently used ones are dropped
+NEIGHBOR_CACHE_SIZE = 65536
+
+# Threshold topology whose edges are never stored: a node's neighbours are found through the
+# spatial index, and their latencies drawn from the latency and failure models, the first time
+# a search expands the node. Latencies are keyed on the node pair, so an edge looks the same
+# from both ends and on every expansion. Memory grows with the nodes a search touches, plus
+# an optional LRU cache of neighbour lists (cache_size=0 disables it).
+# The routing functions accept it wherever they accept a CompactGraph, except Bellman-Ford,
+# which needs every edge up front.
+class ImplicitGraph:
+    directed = False
+    up = None
+    metric = "haversine"
+
+    def __init__(self, servers=servers, threshold=DEFAULT_THRESHOLD, latency_model=None, failure_model=None,
+                 cache_size=NEIGHBOR_CACHE_SIZE):
+        names, self.coords = server_arrays(servers)
+        nodes = getattr(servers, "nodes", None)
+        self.nodes = nodes if nodes is not None and nodes.names == names else NodeInterner(names)
+        self.names = self.nodes.names
+        self.index = self.nodes.index
+        self.pos = self.coords[:, ::-1]  # Longitude, Latitude
+        self.threshold = threshold
+        self.latency_model = latency_model if latency_model is not None else LatencyModel()
+        self.failure_model = failure_model if failure_model is not None else FailureModel()
+        self.seed_key = self.latency_model.seed_sequence.generate_state(1, np.uint64)[0]
+        self.spatial_index = SphericalGridIndex(self.coords, threshold)
+        self.cache_size = cache_size
+        self.version = 0
+        self.expansions = 0
+        self.cache_hits = 0
+        self._neighbors = OrderedDict()
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    # Function to get the integer ID of a node name
+    def node_id(self, name):
+        return self.index[name]
+
+    # Function to translate a path of IDs back to node names
+    def path_names(self, ids):
+        return self.nodes.names_of(ids)
+
+    # Function to compute the live neighbours of u and their latencies
+    def _expand(self, u):
+        lat, lon = self.coords[u]
+        ids, distances = self.spatial_index.query_point(lat, lon)
+        others = ids != u
+        ids, distances = ids[others], distances[others]
+        up = self.failure_model.sample_edges(np.full(len(ids), u), ids, self.seed_key)
+        ids, distances = ids[up], distances[up]
+        order = np.argsort(ids)
+        ids, distances = ids[order], distances[order]
+        weights = self.latency_model.sample_edges(np.full(len(ids), u), ids, distances)
+        return ids.astype(np.int32), weights
+
+    # Function to get the neighbour IDs and edge weights of node u, computing them on first use
+    def neighbors(self, u):
+        cached = self._neighbors.get(u)
+        if cached is not None:
+            self.cache_hits += 1
+            self._neighbors.move_to_end(u)
+            return cached
+        self.expansions += 1
+        result = self._expand(u)
+        if self.cache_size:
+            self._neighbors[u] = result
+            if len(self._neighbors) > self.cache_size:
+                self._neighbors.popitem(last=False)
+        return result
+
+    # Function to get the weight of edge (u, v)
+    def edge_weight(self, u, v):
+        ids, weights = self.neighbors(u)
+        k = np.searchsorted(ids, v)
+        if k == len(ids) or ids[k] != v:
+            raise KeyError(f"No edge between {self.names[u]} and {self.names[v]}")
+        return float(weights[k])
+
+    # Function to get the latency lower bound per km of straight-line distance (used by A*)
+    def latency_scale(self):
+        return self.latency_model.min_latency_per_km()
+
+    # Function to drop every cached neighbour list (e.g. after switching latency model)
+    def clear_cache(self):
+        self._neighbors.clear()
+        self.version += 1
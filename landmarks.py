@@ -0,0 +1,100 @@
+import numpy as np
+from algorithms import _a_star_ids, _shortest_path_tree
+from compact_graph import as_compact_graph, graph_version
+
+# Landmarks picked by default when none are given
+DEFAULT_LANDMARKS = 8
+
+# Function to get the latency from one node to every node
+def _distances_from(cg, source):
+    return _shortest_path_tree(cg, source)[0]
+
+# Function to pick landmarks by farthest-point selection: start from a random node, then keep
+# adding the node farthest (in latency) from every landmark chosen so far. Nodes another component
+# cannot reach count as farthest, so each component gets a landmark before any gets a second.
+# Returns (landmark IDs, array of their distance rows).
+def select_landmarks(cg, count=DEFAULT_LANDMARKS, seed=None):
+    rng = np.random.default_rng(seed)
+    nearest = _distances_from(cg, int(rng.integers(cg.number_of_nodes())))
+    landmarks, rows = [], []
+    for _ in range(min(count, cg.number_of_nodes())):
+        landmark = int(np.argmax(nearest))
+        if rows and nearest[landmark] == 0:
+            break  # Every node is already a landmark or sits on one
+        landmarks.append(landmark)
+        rows.append(_distances_from(cg, landmark))
+        nearest = rows[0] if len(rows) == 1 else np.minimum(nearest, rows[-1])
+    return np.array(landmarks, dtype=np.int64), np.array(rows)
+
+# ALT preprocessing: latency from every landmark to every node (forward[k, v]) and from every node
+# to every landmark (backward[k, v], the same rows on undirected graphs). By the triangle inequality
+#   d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+# so the largest of these over the landmarks is an admissible A* heuristic, and usually a much
+# tighter one than straight-line distance once weather and congestion stretch the latencies.
+# landmarks is a count (chosen by select_landmarks) or a list of node names.
+class LandmarkIndex:
+    def __init__(self, G, landmarks=DEFAULT_LANDMARKS, seed=None):
+        self.graph = as_compact_graph(G)
+        self.spec = landmarks
+        self.seed = seed
+        self.build()
+
+    # Function to (re)compute the landmark distance arrays for the graph's current weights
+    def build(self):
+        cg = self.graph
+        if isinstance(self.spec, int):
+            self.landmarks, self.forward = select_landmarks(cg, self.spec, self.seed)
+        else:
+            self.landmarks = np.array([cg.node_id(name) for name in self.spec], dtype=np.int64)
+            self.forward = np.array([_distances_from(cg, landmark) for landmark in self.landmarks.tolist()])
+        if cg.directed:
+            reverse = cg.reverse()
+            self.backward = np.array([_distances_from(reverse, landmark) for landmark in self.landmarks.tolist()])
+        else:
+            self.backward = self.forward
+        self.version = graph_version(cg)
+
+    # Function to check whether the graph changed since the arrays were computed
+    def is_current(self):
+        return graph_version(self.graph) == self.version
+
+    # Names of the landmark servers
+    @property
+    def landmark_names(self):
+        return self.graph.path_names(self.landmarks.tolist())
+
+    # Function to build the ALT heuristic for one target; maps an array of node IDs to lower bounds
+    def heuristic(self, goal):
+        from_landmarks = self.forward[:, goal][:, None]
+        to_landmarks = self.backward[:, goal][:, None]
+
+        def estimate(ids):
+            with np.errstate(invalid="ignore"):  # inf - inf where a landmark reaches neither node
+                lower = np.maximum(from_landmarks - self.forward[:, ids], self.backward[:, ids] - to_landmarks)
+            return np.fmax(np.fmax.reduce(lower, axis=0), 0.0)  # fmax skips the NaNs
+
+        return estimate
+
+    # Function to run A* with landmark bounds; the RouteResult's expanded counts the nodes settled
+    def route(self, source, target):
+        if not self.is_current():
+            self.build()
+        goal = self.graph.node_id(target)
+        return _a_star_ids(self.graph, self.graph.node_id(source), goal, self.heuristic(goal), "ALT")
+
+# Function to precompute a landmark index for a graph
+def precompute_landmarks(G, landmarks=DEFAULT_LANDMARKS, seed=None):
+    return LandmarkIndex(G, landmarks, seed)
+
+# ALT Algorithm: A* with landmark lower bounds, preprocessing each graph once on first use.
+# The index is kept on the compact graph itself, so it goes away with the graph; an nx graph with
+# no G.graph["version"] gets a fresh compact graph, and so a fresh index, on every call.
+def alt_algorithm(G, source, target):
+    cg = as_compact_graph(G)
+    index = getattr(cg, "_landmark_index", None)
+    if index is None:
+        index = cg._landmark_index = LandmarkIndex(cg)
+    route = index.route(source, target)
+    if route is None:
+        print(f"No path exists between {source} and {target} using ALT.")
+    return route
@@ -1,10 +1,12 @@
-from network_model import create_network_graph, create_sparse_network, create_dense_network
-from algorithms import compare_routing_algorithms, analyze_efficiency_for_large_graph, visualize_network, test_scalability
+from network_model import create_network_variants, DEFAULT_THRESHOLD, SPARSE_THRESHOLD, DENSE_THRESHOLD
+from algorithms import compare_routing_algorithms, analyze_efficiency_for_large_graph, visualize_network, test_scalability, \
+    test_geographic_scalability
 
 # Main execution
 if __name__ == "__main__":
-    # Create the network graph
-    G = create_network_graph()
+    # Create the default, sparse and dense networks from one shared distance pass
+    networks = create_network_variants([DEFAULT_THRESHOLD, SPARSE_THRESHOLD, DENSE_THRESHOLD])
+    G = networks[DEFAULT_THRESHOLD]
 
     # Specify the source and target nodes to test routing algorithms
     source = "Beijing (F-Root)"
@@ -19,13 +21,16 @@ if __name__ == "__main__":
     # Test scalability
     test_scalability()
 
+    # Test scalability on synthetic topologies around the real server sites
+    test_geographic_scalability()
+
     # Test on sparse and dense networks
     print("\nTesting on Sparse Network:")
-    sparse_G = create_sparse_network()
+    sparse_G = networks[SPARSE_THRESHOLD]
     compare_routing_algorithms(sparse_G, source, target)
 
     print("\nTesting on Dense Network:")
-    dense_G = create_dense_network()
+    dense_G = networks[DENSE_THRESHOLD]
     compare_routing_algorithms(dense_G, source, target)
 
     # Visualize the network and the shortest path
@@ -1,6 +1,10 @@
-import networkx as nx
-from geopy.distance import geodesic
+import os
+import tempfile
+import weakref
+import numpy as np
 import random
+from compact_graph import CompactGraph, NodeInterner, as_compact_graph, update_graph_weights
+from distance_engine import server_arrays, threshold_pairs, catalog_key, load_cached_pairs, save_cached_pairs
 
 # Server data with location details
 servers = {
@@ -26,6 +30,9 @@ servers = {
     "Hongkong (F-Root)": (22.402082576524865, 114.10929040891995),
 }
 
+# Chance that a link is down when a topology is built
+LINK_DOWN_PROBABILITY = 0.1
+
 # Function to simulate dynamic factors affecting latency
 def get_dynamic_latency(distance):
     # Simulate weather effects (e.g., 1.2x latency during bad weather)
@@ -35,68 +42,372 @@ def get_dynamic_latency(distance):
     congestion_factor = random.uniform(1.0, 1.5)  # Random factor between 1.0 and 1.5
 
     # Simulate server downtime (e.g., 10% chance of server downtime)
-    downtime_factor = random.choice([1, float('inf')])  # 1 means no downtime, inf means downtime
-    
+    downtime_factor = float('inf') if random.random() < LINK_DOWN_PROBABILITY else 1  # inf means downtime
+
     if downtime_factor == float('inf'):
         return float('inf')  # Server is down, set latency to infinity
 
     return distance * 0.1 * weather_factor * congestion_factor  # Simulated latency with weather and congestion factors
 
-# Function to create the network graph with dynamic latency
-def create_network_graph(threshold=2000):
-    G = nx.Graph()
+# Function to mix 64-bit integers into well-spread hashes (splitmix64 finalizer), element-wise
+def _splitmix64(x):
+    with np.errstate(over="ignore"):
+        z = np.asarray(x, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
 
-    # Adding nodes
-    for server, location in servers.items():
-        G.add_node(server, pos=(location[1], location[0]))  # Longitude, Latitude
-
-    # Adding edges with dynamic latency
-    for server1, loc1 in servers.items():
-        for server2, loc2 in servers.items():
-            if server1 != server2:
-                distance = geodesic(loc1, loc2).kilometers
-                if distance <= threshold:
-                    latency = get_dynamic_latency(distance)  # Apply dynamic latency
-                    G.add_edge(server1, server2, weight=latency)
+# Function to derive reproducible uniforms in [0, 1) for undirected edges (a, b).
+# The value depends only on the seed key, the unordered pair and the stream number, so an
+# edge gets the same draw whichever endpoint asks for it and however often it is asked.
+def keyed_uniforms(seed_key, a, b, stream):
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    mixed = _splitmix64(np.uint64(seed_key) ^ _splitmix64(low ^ _splitmix64(high + np.uint64(stream))))
+    return (mixed >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
 
-    return G
+# Batched, seeded latency model: the weather and congestion factors of every edge are drawn
+# in one call from a numpy Generator, so a seed reproduces the same weights anywhere.
+# Link downtime is drawn separately by a FailureModel from the same generator.
+class LatencyModel:
+    def __init__(self, seed=None, weather_range=(1.0, 1.3), congestion_range=(1.0, 1.5), latency_per_km=0.1):
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.weather_range = weather_range  # Bad weather slows links by up to 1.3x
+        self.congestion_range = congestion_range  # Peak-hour congestion slows links by up to 1.5x
+        self.latency_per_km = latency_per_km
 
-# Function to create a sparse network
-def create_sparse_network():
-    G = nx.Graph()
+    # Function to draw one latency per distance
+    def sample(self, distances):
+        distances = np.asarray(distances, dtype=np.float64)
+        m = len(distances)
+        weather = self.rng.uniform(*self.weather_range, m)
+        congestion = self.rng.uniform(*self.congestion_range, m)
+        return self.apply(distances, weather, congestion)
+
+    # Function to turn distances and given weather / congestion factors into latencies
+    def apply(self, distances, weather, congestion):
+        return np.asarray(distances, dtype=np.float64) * self.latency_per_km * weather * congestion
+
+    # Function to get the smallest latency one km of link can have under this model
+    def min_latency_per_km(self):
+        return self.latency_per_km * min(self.weather_range) * min(self.congestion_range)
+
+    # Function to draw latencies for edges (u, v) that are fixed by the seed and the node pair,
+    # for graphs whose edges are generated on demand rather than in one batch
+    def sample_edges(self, u, v, distances):
+        key = self.seed_sequence.generate_state(1, np.uint64)[0]
+        weather = self.weather_range[0] + np.diff(self.weather_range)[0] * keyed_uniforms(key, u, v, 0)
+        congestion = self.congestion_range[0] + np.diff(self.congestion_range)[0] * keyed_uniforms(key, u, v, 1)
+        return self.apply(distances, weather, congestion)
+
+    # Function to create independent, reproducible child models, e.g. one per worker process
+    def spawn(self, n):
+        return [LatencyModel(child, self.weather_range, self.congestion_range, self.latency_per_km)
+                for child in self.seed_sequence.spawn(n)]
+
+    # Per-edge call, compatible with get_dynamic_latency
+    def __call__(self, distance):
+        return float(self.sample([distance])[0])
+
+# Link-failure model. Each link is down with link_down_probability; mode="drop" leaves downed
+# links out of the topology, mode="mask" keeps them but flags them down so the engines skip them.
+class FailureModel:
+    MODES = ("drop", "mask")
+
+    def __init__(self, link_down_probability=LINK_DOWN_PROBABILITY, mode="drop"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown failure mode: {mode}")
+        self.link_down_probability = link_down_probability
+        self.mode = mode
+
+    # Function to draw which of m links are up, as a boolean array
+    def sample(self, m, rng):
+        if self.link_down_probability <= 0:
+            return np.ones(m, dtype=bool)
+        return rng.random(m) >= self.link_down_probability
+
+    # Function to decide which edges (u, v) are up, fixed by the seed key and the node pair
+    def sample_edges(self, u, v, seed_key):
+        if self.link_down_probability <= 0:
+            return np.ones(len(u), dtype=bool)
+        return keyed_uniforms(seed_key, u, v, 2) >= self.link_down_probability
+
+# Failure model that keeps every link up
+NO_FAILURES = FailureModel(0.0)
+
+# Function to draw latencies for a batch of distances from a LatencyModel or a per-edge function
+def sample_latencies(latency_model, distances):
+    if hasattr(latency_model, "sample"):
+        return latency_model.sample(distances)
+    return np.fromiter(map(latency_model, np.asarray(distances).tolist()), dtype=np.float64, count=len(distances))
+
+# Distance thresholds (km) for the predefined topologies
+DEFAULT_THRESHOLD = 2000
+SPARSE_THRESHOLD = 7000  # Kept from the original sparse builder
+DENSE_THRESHOLD = 4000  # Kept from the original dense builder
+
+# Directory holding persisted pair tables; pass cache_dir=None to keep distances in memory only
+DISTANCE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".distance_cache")
+
+# Cache of server-pair distances shared by every topology built from one catalog.
+# It holds the pairs for the widest threshold measured so far; narrower thresholds just filter them.
+# Pair tables are also persisted under cache_dir, keyed by a hash of the catalog, and memory-mapped
+# on later runs; editing the catalog changes the key, so stale tables are never read.
+class DistanceCache:
+    def __init__(self, servers=servers, method="haversine", cache_dir=DISTANCE_CACHE_DIR):
+        self.names, self.coords = server_arrays(servers)
+        self.method = method
+        self.cache_dir = cache_dir
+        self.key = catalog_key(self.names, self.coords, method)
+        self.radius = None
+        self._pairs = None
+
+    # Function to measure all pairs up to the widest of several thresholds in a single pass
+    def prepare(self, thresholds):
+        self.pairs(max(thresholds))
+
+    # Function to load the pairs from disk, or measure and persist them
+    def _load_or_measure(self, threshold):
+        if self.cache_dir:
+            cached = load_cached_pairs(self.cache_dir, self.key, threshold)
+            if cached is not None:
+                i, j, distances, self.radius = cached
+                self._pairs = (i, j, distances)
+                return
+        self._pairs = threshold_pairs(self.coords, threshold, self.method)
+        self.radius = threshold
+        if self.cache_dir:
+            try:
+                save_cached_pairs(self.cache_dir, self.key, threshold, *self._pairs)
+            except OSError as e:
+                print(f"Could not persist distance cache: {e}")
+
+    # Function to return (i, j, distance) for every pair within the threshold
+    def pairs(self, threshold):
+        if self.radius is None or threshold > self.radius:
+            self._load_or_measure(threshold)
+        i, j, distances = self._pairs
+        if threshold == self.radius:
+            return i, j, distances
+        keep = distances <= threshold
+        return i[keep], j[keep], distances[keep]
+
+_distance_caches = {}
+
+# Function to get the shared distance cache for a catalog; a changed catalog gets a fresh cache
+def get_distance_cache(servers=servers, method="haversine"):
+    names, coords = server_arrays(servers)
+    key = catalog_key(names, coords, method)
+    cache = _distance_caches.get(key)
+    if cache is None:
+        cache = _distance_caches[key] = DistanceCache(servers, method)
+    return cache
+
+# Function to build a topology linking every pair of servers within the threshold
+# servers is a {name: (lat, lon)} mapping or a ServerCatalog (see catalog.load_server_catalog);
+# latency_model is a LatencyModel (a fresh unseeded one by default) or a per-edge function;
+# failure_model decides which links are down (FailureModel() by default, NO_FAILURES for none).
+# Links with a non-finite latency are treated as down as well.
+# compact=True returns a CompactGraph (CSR arrays) instead of an nx.Graph
+def build_network(threshold=DEFAULT_THRESHOLD, latency_model=None, servers=servers, cache=None, compact=False,
+                  failure_model=None):
+    cache = cache or get_distance_cache(servers)
+    latency_model = latency_model if latency_model is not None else LatencyModel()
+    failure_model = failure_model if failure_model is not None else FailureModel()
+    i, j, distances = cache.pairs(threshold)
+    nodes = getattr(servers, "nodes", None)  # A ServerCatalog already carries its ID mapping
+    if nodes is None or nodes.names != cache.names:
+        nodes = NodeInterner(cache.names)  # Server names -> dense integer IDs used by the routing engines
+    latencies = sample_latencies(latency_model, distances)  # Apply dynamic latency to every edge at once
+
+    # Decide which links are down, then drop them or keep them as a mask
+    rng = getattr(latency_model, "rng", None) or np.random.default_rng()
+    up = failure_model.sample(len(latencies), rng) & np.isfinite(latencies)
+    if failure_model.mode == "drop":
+        i, j, latencies, distances = i[up], j[up], latencies[up], distances[up]
+        up = None
+    elif up.all():
+        up = None
+
+    if compact:
+        pos = cache.coords[:, ::-1]  # Longitude, Latitude
+        return CompactGraph.from_edges(nodes, i, j, latencies, pos, up=up, distances=distances)
+
+    import networkx as nx
+
+    # version opts the graph in to cached compact views; edit weights through update_edge_latencies
+    G = nx.Graph(nodes=nodes, version=0)
 
     # Adding nodes
-    for server, location in servers.items():
-        G.add_node(server, pos=(location[1], location[0]))  # Longitude, Latitude
-
-    # Adding edges with a higher threshold to make the network sparse
-    threshold = 7000  # Higher threshold means fewer edges
-    for server1, loc1 in servers.items():
-        for server2, loc2 in servers.items():
-            if server1 != server2:
-                distance = geodesic(loc1, loc2).kilometers
-                if distance <= threshold:
-                    latency = get_dynamic_latency(distance)  # Apply dynamic latency
-                    G.add_edge(server1, server2, weight=latency)
+    for server, (lat, lon) in zip(cache.names, cache.coords.tolist()):
+        G.add_node(server, pos=(lon, lat))  # Longitude, Latitude
+
+    # Adding edges with dynamic latency (the distance is kept so latencies can be refreshed in place)
+    names = cache.names
+    G.add_edges_from((names[a], names[b], {'weight': latency, 'distance': distance})
+                     for a, b, latency, distance in zip(i.tolist(), j.tolist(), latencies.tolist(), distances.tolist()))
+    if up is not None:
+        for a, b in zip(i[~up].tolist(), j[~up].tolist()):
+            G.edges[names[a], names[b]]['up'] = False  # Downed link kept in the topology but skipped by routing
 
     return G
 
+# Function to build several threshold variants from one distance pass
+def create_network_variants(thresholds, latency_model=None, servers=servers, compact=False, failure_model=None):
+    cache = get_distance_cache(servers)
+    cache.prepare(thresholds)
+    return {threshold: build_network(threshold, latency_model, servers, cache, compact, failure_model)
+            for threshold in thresholds}
+
+# Function to create the network graph with dynamic latency
+def create_network_graph(threshold=DEFAULT_THRESHOLD):
+    return build_network(threshold)
+
+# Function to create a sparse network
+def create_sparse_network():
+    return build_network(SPARSE_THRESHOLD)
+
 # Function to create a dense network
 def create_dense_network():
-    G = nx.Graph()
+    return build_network(DENSE_THRESHOLD)
 
-    # Adding nodes
-    for server, location in servers.items():
-        G.add_node(server, pos=(location[1], location[0]))  # Longitude, Latitude
-
-    # Adding edges with a lower threshold to make the network dense
-    threshold = 4000  # Lower threshold means more edges
-    for server1, loc1 in servers.items():
-        for server2, loc2 in servers.items():
-            if server1 != server2:
-                distance = geodesic(loc1, loc2).kilometers
-                if distance <= threshold:
-                    latency = get_dynamic_latency(distance)  # Apply dynamic latency
-                    G.add_edge(server1, server2, weight=latency)
-
-    return G
\ No newline at end of file
+# Function to apply a batch of (u, v, new_latency) changes to a built graph in place
+# Returns the graph's new version number
+def update_edge_latencies(G, changes):
+    u_names, v_names, latencies = zip(*changes) if changes else ((), (), ())
+    return update_graph_weights(G, u_names, v_names, latencies)
+
+# Function to redraw every edge latency in place from the stored edge distances.
+# Pass weather / congestion arrays (one factor per edge, in G's edge order) to apply given
+# conditions; otherwise they are drawn from latency_model. Returns the graph's new version.
+def refresh_latencies(G, latency_model=None, weather=None, congestion=None):
+    latency_model = latency_model if latency_model is not None else LatencyModel()
+    if isinstance(G, CompactGraph):
+        if G.edge_distance is None:
+            raise ValueError("Graph has no stored edge distances to refresh latencies from")
+        distances = G.edge_distance
+    else:
+        distances = np.array([d for _, _, d in G.edges(data='distance')], dtype=np.float64)
+        if np.isnan(distances).any():
+            raise ValueError("Graph has no stored edge distances to refresh latencies from")
+
+    if weather is None and congestion is None:
+        latencies = sample_latencies(latency_model, distances)
+    else:
+        m = len(distances)
+        weather = np.ones(m) if weather is None else np.asarray(weather, dtype=np.float64)
+        congestion = np.ones(m) if congestion is None else np.asarray(congestion, dtype=np.float64)
+        latencies = latency_model.apply(distances, weather, congestion)
+
+    if isinstance(G, CompactGraph):
+        G.set_edge_weights(latencies)
+        return G.version
+    u_names, v_names = zip(*G.edges()) if G.number_of_edges() else ((), ())
+    return update_graph_weights(G, u_names, v_names, latencies)
+
+# Snapshot stores larger than this are written to a memory-mapped file instead of RAM
+SNAPSHOT_MEMMAP_BYTES = 256 * 1024 * 1024
+
+# Time series of latencies for one fixed edge set, stored as a contiguous (time x edge) array.
+# Column k belongs to edge (graph.edge_u[k], graph.edge_v[k]). Link failures are kept apart in a
+# boolean (time x edge) up mask (None when every link stays up), so each step's latencies are
+# real values and graph_at(t) masks the downed links the same way CompactGraph.up does.
+# graph_at(t) gives a routable graph for one time step that shares the topology arrays.
+class LatencySnapshots:
+    def __init__(self, graph, latencies, up=None):
+        self.graph = as_compact_graph(graph)
+        self.latencies = latencies
+        self.up = up
+        if latencies.shape[1] != self.graph.number_of_edges():
+            raise ValueError("Snapshot columns must match the graph's edges")
+        if up is not None and up.shape != latencies.shape:
+            raise ValueError("Snapshot up mask must match the latency array")
+
+    # Function to get the file holding the up mask of a snapshot file
+    @staticmethod
+    def mask_path(path):
+        return os.path.splitext(path)[0] + ".up.npy"
+
+    # Function to draw latencies for the given number of time steps.
+    # time_factors optionally scales each step (e.g. a daily congestion curve); the arrays are
+    # memory-mapped at path (the up mask next to it, see mask_path), or in temporary files when
+    # they exceed SNAPSHOT_MEMMAP_BYTES. Temporary files are deleted with the snapshots object.
+    @classmethod
+    def generate(cls, graph, steps, latency_model=None, failure_model=NO_FAILURES, time_factors=None,
+                 path=None, dtype=np.float64):
+        graph = as_compact_graph(graph)
+        if graph.edge_distance is None:
+            raise ValueError("Graph has no stored edge distances to draw latencies from")
+        latency_model = latency_model if latency_model is not None else LatencyModel()
+        rng = getattr(latency_model, "rng", None) or np.random.default_rng()
+
+        shape = (steps, graph.number_of_edges())
+        temporary = path is None and np.dtype(dtype).itemsize * shape[0] * shape[1] > SNAPSHOT_MEMMAP_BYTES
+        if temporary:
+            fd, path = tempfile.mkstemp(suffix=".npy", prefix="latency-snapshots-")
+            os.close(fd)
+        if path is None:
+            latencies = np.empty(shape, dtype=dtype)
+        else:
+            latencies = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        up = None
+        if failure_model.link_down_probability > 0:
+            if path is None:
+                up = np.empty(shape, dtype=bool)
+            else:
+                up = np.lib.format.open_memmap(cls.mask_path(path), mode="w+", dtype=bool, shape=shape)
+        elif path is not None and os.path.exists(cls.mask_path(path)):
+            os.remove(cls.mask_path(path))  # Left over from an earlier run with failures
+
+        for t in range(steps):
+            row = sample_latencies(latency_model, graph.edge_distance)
+            if time_factors is not None:
+                row *= time_factors[t]
+            latencies[t] = row
+            if up is not None:
+                up[t] = failure_model.sample(len(row), rng)
+        if path is not None:
+            latencies.flush()
+            if up is not None:
+                up.flush()
+
+        snapshots = cls(graph, latencies, up)
+        if temporary:
+            files = [path] if up is None else [path, cls.mask_path(path)]
+            weakref.finalize(snapshots, _remove_files, files)
+        return snapshots
+
+    # Function to open a snapshot file written by generate(path=...) without reading it into memory
+    @classmethod
+    def load(cls, graph, path):
+        mask_path = cls.mask_path(path)
+        up = np.load(mask_path, mmap_mode="r") if os.path.exists(mask_path) else None
+        return cls(graph, np.load(path, mmap_mode="r"), up)
+
+    def __len__(self):
+        return len(self.latencies)
+
+    # Function to get the graph as it was at time step t
+    def graph_at(self, t):
+        return self.graph.with_edge_weights(self.latencies[t], None if self.up is None else self.up[t])
+
+    # Function to get the latency of edge (u, v) (given by name) over all time steps: a column view,
+    # or a copy holding inf at the steps where the link was down. KeyError if there is no such edge.
+    def edge_series(self, u, v):
+        slot = self.graph.slot(self.graph.node_id(u), self.graph.node_id(v))
+        if slot < 0:
+            raise KeyError(f"No edge between {u} and {v}")
+        edge = self.graph.slot_edge[slot]
+        if self.up is None:
+            return self.latencies[:, edge]
+        return np.where(self.up[:, edge], self.latencies[:, edge], np.inf)
+
+# Function to delete temporary snapshot files
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,96 @@
+import random
+import networkx as nx
+import pytest
+from compact_graph import update_graph_weights
+from contraction import ContractionHierarchy, contraction_hierarchy_algorithm
+from hub_labels import build_hub_labels
+
+# Random graphs checked per test
+TRIALS = 12
+
+# Function to build a random versioned graph with positive weights (some zero) and a few downed links
+def random_graph(rng, directed):
+    n = rng.randint(2, 30)
+    G = nx.gnp_random_graph(n, rng.uniform(0.05, 0.3), seed=rng.randrange(2 ** 32), directed=directed)
+    G.graph["version"] = 0
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = rng.choice([0.0, 1.0, rng.uniform(0.1, 10)])
+    for u, v in rng.sample(list(G.edges), min(2, G.number_of_edges())):
+        G.edges[u, v]["up"] = False
+    return G
+
+# Function to get every shortest-path latency over G's live links
+def live_distances(G):
+    live = nx.subgraph_view(G, filter_edge=lambda u, v: G.edges[u, v].get("up", True))
+    return dict(nx.all_pairs_dijkstra_path_length(live))
+
+# Function to check every route an index gives against the expected latencies; the paths must
+# use live links and add up to the reported cost
+def assert_routes(G, index, expected):
+    for source in G:
+        for target in G:
+            route = index.route(source, target)
+            if target not in expected[source]:
+                assert route is None
+                continue
+            assert route.path[0] == source and route.path[-1] == target
+            assert all(G.edges[a, b].get("up", True) for a, b in zip(route.path, route.path[1:]))
+            assert sum(G.edges[a, b]["weight"] for a, b in zip(route.path, route.path[1:])) == \
+                pytest.approx(expected[source][target])
+            assert route.cost == pytest.approx(expected[source][target])
+
+# Function to draw new weights for every link of G through update_graph_weights
+def reweight(rng, G):
+    u, v = zip(*G.edges) if G.number_of_edges() else ((), ())
+    update_graph_weights(G, u, v, [rng.uniform(0.1, 10) for _ in u])
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_contraction_hierarchy_matches_dijkstra(directed):
+    rng = random.Random(11)
+    for _ in range(TRIALS):
+        G = random_graph(rng, directed)
+        hierarchy = ContractionHierarchy(G)
+        assert_routes(G, hierarchy, live_distances(G))
+
+        # Customizing for new weights keeps the topology and gives the new shortest paths
+        reweight(rng, G)
+        order = hierarchy.order.copy()
+        hierarchy.customize()
+        assert (hierarchy.order == order).all()
+        assert_routes(G, hierarchy, live_distances(G))
+
+def test_contraction_hierarchy_with_given_order():
+    rng = random.Random(5)
+    G = random_graph(rng, directed=True)
+    order = list(range(G.number_of_nodes()))
+    rng.shuffle(order)
+    hierarchy = ContractionHierarchy(G, order=order)
+    assert hierarchy.order.tolist() == order
+    assert_routes(G, hierarchy, live_distances(G))
+
+def test_contraction_hierarchy_algorithm_follows_weight_changes():
+    G = nx.Graph(version=0)
+    G.add_weighted_edges_from([("a", "b", 1.0), ("b", "c", 1.0), ("a", "c", 5.0)])
+    assert contraction_hierarchy_algorithm(G, "a", "c").path == ["a", "b", "c"]
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    assert contraction_hierarchy_algorithm(G, "a", "c").path == ["a", "c"]
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_hub_labels_match_dijkstra(directed):
+    rng = random.Random(13)
+    for _ in range(TRIALS):
+        G = random_graph(rng, directed)
+        labels = build_hub_labels(G, processes=1)
+        expected = live_distances(G)
+        assert_routes(G, labels, expected)
+        for source in G:
+            for target in G:
+                assert labels.latency(source, target) == pytest.approx(expected[source].get(target, float("inf")))
+
+def test_hub_labels_split_over_processes():
+    rng = random.Random(17)
+    G = random_graph(rng, directed=True)
+    single = build_hub_labels(G, processes=1)
+    split = build_hub_labels(G, processes=2)
+    for one, other in zip(single.forward + single.backward, split.forward + split.backward):
+        assert (one == other).all()
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+# Import-time budget (seconds) for the modules a route query needs; numpy accounts for most of it
+IMPORT_BUDGET_SECONDS = 0.5
+
+# Modules that must not be imported just to answer route queries
+HEAVY_MODULES = ("networkx", "matplotlib", "geopy")
+
+# Function to time, in a fresh interpreter, importing the given modules.
+# Returns (seconds, heavy modules that got imported along the way).
+def measure_import(modules):
+    code = ("import sys, time; start = time.perf_counter(); import {}; elapsed = time.perf_counter() - start; "
+            "print(elapsed); print(','.join(m for m in {!r} if m in sys.modules))").format(", ".join(modules), HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed, heavy = result.stdout.splitlines()
+    return float(elapsed), [name for name in heavy.split(",") if name]
+
+def test_routing_imports_stay_lazy():
+    _, heavy = measure_import(("algorithms", "network_model"))
+    assert not heavy, f"Eagerly imported: {heavy}"
+
+def test_routing_imports_within_budget():
+    elapsed, _ = measure_import(("algorithms", "network_model"))
+    assert elapsed <= IMPORT_BUDGET_SECONDS, f"Import took {elapsed * 1000:.1f} ms"
@@ -0,0 +1,62 @@
+import random
+import networkx as nx
+import pytest
+from algorithms import bellman_ford_algorithm, spfa_algorithm
+
+# Random graphs checked per engine
+TRIALS = 20
+
+# Engines that accept negative link weights
+NEGATIVE_WEIGHT_ENGINES = (bellman_ford_algorithm, spfa_algorithm)
+
+# Function to build a random directed graph with negative weights but no negative cycle: every
+# weight is a positive length plus a potential difference, and the potentials cancel around a cycle
+def random_potential_graph(rng, n, p):
+    G = nx.gnp_random_graph(n, p, seed=rng.randrange(2 ** 32), directed=True)
+    potential = [rng.uniform(0, 10) for _ in range(n)]
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = rng.uniform(0.1, 5) + potential[u] - potential[v]
+    return G
+
+# Function to check that a route is a real path of G from source to target whose cost is expected
+def assert_route(G, route, source, target, expected):
+    assert route.path[0] == source and route.path[-1] == target
+    assert all(G.has_edge(a, b) for a, b in zip(route.path, route.path[1:]))
+    assert sum(G.edges[a, b]["weight"] for a, b in zip(route.path, route.path[1:])) == pytest.approx(expected)
+    assert route.cost == pytest.approx(expected)
+
+@pytest.mark.parametrize("engine", NEGATIVE_WEIGHT_ENGINES)
+def test_negative_weights_match_networkx(engine):
+    rng = random.Random(7)
+    for _ in range(TRIALS):
+        G = random_potential_graph(rng, rng.randint(2, 25), rng.uniform(0.05, 0.3))
+        assert any(w < 0 for _, _, w in G.edges(data="weight")) or G.number_of_edges() < 3
+        for source in G:
+            expected = nx.single_source_bellman_ford_path_length(G, source)
+            for target in G:
+                route = engine(G, source, target)
+                if target in expected:
+                    assert_route(G, route, source, target, expected[target])
+                else:
+                    assert route is None
+
+@pytest.mark.parametrize("engine", NEGATIVE_WEIGHT_ENGINES)
+def test_negative_cycle_is_reported(engine):
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([(0, 1, 1.0), (1, 2, -2.0), (2, 3, 1.0), (3, 1, -0.5), (2, 4, 3.0)])
+    assert nx.negative_edge_cycle(G)
+    assert engine(G, 0, 4) is None
+
+@pytest.mark.parametrize("engine", NEGATIVE_WEIGHT_ENGINES)
+def test_unreachable_negative_cycle_is_ignored(engine):
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([(0, 1, 2.0), (1, 2, -1.0), (3, 4, -3.0), (4, 3, 1.0), (4, 0, 1.0)])
+    assert_route(G, engine(G, 0, 2), 0, 2, 1.0)
+
+def test_bellman_ford_counts_each_node_once():
+    G = nx.path_graph(6, create_using=nx.DiGraph)
+    nx.set_edge_attributes(G, 1.0, "weight")
+    G.add_edge(0, 5, weight=10.0)
+    route = bellman_ford_algorithm(G, 0, 5)
+    assert route.path == [0, 1, 2, 3, 4, 5]
+    assert route.expanded == 6
@@ -0,0 +1,99 @@
+import networkx as nx
+import pytest
+from algorithms import RouteCache, dijkstra_algorithm
+from all_pairs import precompute_all_pairs
+from compact_graph import StaleIndexError, as_compact_graph, update_graph_weights
+from contraction import ContractionHierarchy
+from hub_labels import HubLabels, build_hub_labels
+from landmarks import alt_algorithm
+
+# Function to build a small versioned graph where a-b-c is the short way round and a-c the long way
+def triangle_graph():
+    G = nx.Graph(version=0)
+    G.add_weighted_edges_from([("a", "b", 1.0), ("b", "c", 1.0), ("a", "c", 5.0), ("c", "d", 1.0)])
+    return G
+
+def test_update_graph_weights_patches_the_cached_view():
+    G = triangle_graph()
+    view = as_compact_graph(G)
+    assert update_graph_weights(G, ["a"], ["c"], [0.5]) == 1
+    assert G.graph["version"] == 1 and G.edges["a", "c"]["weight"] == 0.5
+    assert as_compact_graph(G) is view
+    route = dijkstra_algorithm(G, "a", "d")
+    assert route.path == ["a", "c", "d"] and route.cost == pytest.approx(1.5)
+
+def test_update_graph_weights_rejects_non_edges():
+    G = triangle_graph()
+    with pytest.raises(KeyError):
+        update_graph_weights(G, ["a", "a"], ["c", "d"], [0.5, 0.5])
+    assert G.graph["version"] == 0 and G.edges["a", "c"]["weight"] == 5.0
+
+def test_route_cache_drops_routes_after_weight_changes():
+    G = triangle_graph()
+    cache = RouteCache(G)
+    assert cache.route("a", "c").path == ["a", "b", "c"]
+    assert cache.route("a", "c").path == ["a", "b", "c"]
+    assert cache.hits == 1 and len(cache) == 1
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    assert cache.route("a", "c").path == ["a", "c"]
+    assert cache.invalidations == 1 and len(cache) == 1
+
+def test_route_cache_never_stores_unversioned_graphs():
+    G = triangle_graph()
+    del G.graph["version"]
+    cache = RouteCache(G)
+    assert cache.route("a", "c").path == ["a", "b", "c"]
+    G.edges["a", "c"]["weight"] = 0.5
+    assert cache.route("a", "c").path == ["a", "c"]
+    assert len(cache) == 0 and cache.hits == 0
+
+def test_all_pairs_table_goes_stale():
+    G = triangle_graph()
+    table = precompute_all_pairs(G, processes=1)
+    assert table.latency("a", "c") == 2.0
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    with pytest.raises(StaleIndexError):
+        table.latency("a", "c")
+    with pytest.raises(StaleIndexError):
+        table.route("a", "c")
+
+def test_hub_labels_go_stale():
+    G = triangle_graph()
+    labels = build_hub_labels(G, processes=1)
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    with pytest.raises(StaleIndexError):
+        labels.latency("a", "c")
+    with pytest.raises(StaleIndexError):
+        labels.route("a", "c")
+
+def test_saved_hub_labels_go_stale(tmp_path):
+    G = triangle_graph()
+    build_hub_labels(G, processes=1).save(tmp_path / "labels")
+    assert HubLabels.load(tmp_path / "labels", G).latency("a", "d") == 3.0
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    with pytest.raises(StaleIndexError):
+        HubLabels.load(tmp_path / "labels", G)
+
+def test_contraction_hierarchy_goes_stale():
+    G = triangle_graph()
+    hierarchy = ContractionHierarchy(G)
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    with pytest.raises(StaleIndexError):
+        hierarchy.route("a", "c")
+    hierarchy.customize()
+    assert hierarchy.route("a", "c").path == ["a", "c"]
+
+def test_contraction_hierarchy_auto_customizes():
+    G = triangle_graph()
+    hierarchy = ContractionHierarchy(G, auto_customize=True)
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    assert hierarchy.route("a", "c").path == ["a", "c"]
+    assert hierarchy.customizations == 2 and hierarchy.is_current()
+
+def test_alt_rebuilds_its_index():
+    G = triangle_graph()
+    assert alt_algorithm(G, "a", "c").path == ["a", "b", "c"]
+    index = as_compact_graph(G)._landmark_index
+    update_graph_weights(G, ["a"], ["c"], [0.5])
+    assert alt_algorithm(G, "a", "c").path == ["a", "c"]
+    assert as_compact_graph(G)._landmark_index is index and index.is_current()
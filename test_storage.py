@@ -0,0 +1,100 @@
+import networkx as nx
+import numpy as np
+import pytest
+from algorithms import dijkstra_algorithm
+from array_store import read_array_bundle, write_array_bundle
+from compact_graph import CompactGraph, load_graph, save_graph
+from hub_labels import HubLabels, build_hub_labels
+from network_model import FailureModel, LatencyModel, LatencySnapshots
+
+# Arrays attached to a CompactGraph that save() must keep
+GRAPH_ARRAYS = ("offsets", "targets", "weights", "slot_edge", "edge_u", "edge_v", "pos", "up", "edge_distance")
+
+# Which links of server_graph() are up: the last one, server-1 to server-5, is down
+LINKS_UP = (True, True, True, True, True, True, False)
+
+# Function to build a small compact graph over named servers with coordinates, distances and a downed link
+def server_graph():
+    names = [f"server-{k}" for k in range(6)]
+    u = [0, 0, 1, 2, 3, 4, 1]
+    v = [1, 2, 2, 3, 4, 5, 5]
+    distances = [120.0, 300.0, 150.0, 90.0, 400.0, 210.0, 800.0]
+    pos = [(10.0 + k, 20.0 - k) for k in range(6)]
+    return CompactGraph.from_edges(names, u, v, np.array(distances) * 0.1, pos, up=LINKS_UP, distances=distances)
+
+def test_array_bundle_round_trip(tmp_path):
+    arrays = {
+        "ints": np.arange(10, dtype=np.int32),
+        "floats": np.linspace(0, 1, 7),
+        "matrix": np.arange(12, dtype=np.int64).reshape(3, 4),
+        "flags": np.array([True, False, True]),
+        "empty": np.zeros(0, dtype=np.float32),
+    }
+    meta = {"nodes": 3, "label": "test"}
+    write_array_bundle(tmp_path / "bundle", arrays, meta)
+    loaded, loaded_meta = read_array_bundle(tmp_path / "bundle", mode="r")
+    assert loaded_meta == meta
+    assert loaded.keys() == arrays.keys()
+    for name, array in arrays.items():
+        assert loaded[name].dtype == array.dtype and loaded[name].shape == array.shape
+        assert (loaded[name] == array).all()
+
+def test_array_bundle_rejects_other_files(tmp_path):
+    (tmp_path / "other").write_bytes(b"not a bundle")
+    with pytest.raises(ValueError):
+        read_array_bundle(tmp_path / "other")
+
+def test_compact_graph_round_trip(tmp_path):
+    graph = server_graph()
+    graph.set_weights([0], [1], [7.5])
+    save_graph(graph, tmp_path / "graph")
+    loaded = load_graph(tmp_path / "graph")
+    for name in GRAPH_ARRAYS:
+        assert (getattr(loaded, name) == getattr(graph, name)).all()
+    assert list(loaded.names) == list(graph.names)
+    assert loaded.node_id("server-3") == 3
+    assert loaded.version == graph.version and loaded.directed == graph.directed
+    assert dijkstra_algorithm(loaded, "server-0", "server-5").path == \
+        dijkstra_algorithm(graph, "server-0", "server-5").path
+
+def test_networkx_graph_round_trip(tmp_path):
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([(1, 2, 0.5), (2, 3, 1.5), (1, 3, 3.0), ("x", 1, 1.0)])
+    save_graph(G, tmp_path / "graph")
+    loaded = load_graph(tmp_path / "graph")
+    assert loaded.directed
+    assert list(loaded.names) == list(G.nodes)
+    assert dijkstra_algorithm(loaded, "x", 3).path == ["x", 1, 2, 3]
+    assert dijkstra_algorithm(loaded, "x", 3).cost == pytest.approx(3.0)
+
+def test_hub_labels_round_trip(tmp_path):
+    graph = server_graph()
+    labels = build_hub_labels(graph, processes=1)
+    labels.save(tmp_path / "labels")
+    loaded = HubLabels.load(tmp_path / "labels", graph)
+    for source in graph.names:
+        for target in graph.names:
+            assert loaded.latency(source, target) == labels.latency(source, target)
+            route = loaded.route(source, target)
+            assert route.path == labels.route(source, target).path
+
+def test_latency_snapshots_round_trip(tmp_path):
+    graph = server_graph()
+    model = LatencyModel(seed=3)
+    snapshots = LatencySnapshots.generate(graph, 4, model, FailureModel(0.3), path=str(tmp_path / "snapshots.npy"))
+    loaded = LatencySnapshots.load(graph, str(tmp_path / "snapshots.npy"))
+    assert (loaded.latencies == snapshots.latencies).all()
+    assert (loaded.up == snapshots.up).all()
+    assert np.isfinite(loaded.latencies).all()
+
+    # Links down at a step are masked in that step's graph, on top of the graph's own mask
+    for t in range(len(loaded)):
+        step = loaded.graph_at(t)
+        live = np.zeros(graph.number_of_edges(), dtype=bool)
+        live[step.slot_edge[step.up if step.up is not None else slice(None)]] = True
+        assert (live == loaded.up[t] & np.array(LINKS_UP)).all()
+
+    series = loaded.edge_series("server-0", "server-1")
+    assert (np.isinf(series) == ~loaded.up[:, 0]).all()
+    with pytest.raises(KeyError):
+        loaded.edge_series("server-0", "server-5")